@@ -1,43 +1,62 @@
 import json
 import os
-import subprocess
 import sys
-import tempfile
 import threading
+import time
 import tkinter as tk
-import zipfile
-import re
+from multiprocessing import freeze_support
 from tkinter import filedialog, messagebox, ttk
-from urllib.request import Request, urlopen
 
-try:
-    from tkinterdnd2 import DND_FILES, TkinterDnD
-except Exception:
-    DND_FILES = None
-    TkinterDnD = None
+from listview import VirtualList
+from metadata import prefetch_info
+from jobs import JobQueue
+from progress import JobCancelled, ProgressChannel, format_stage_times
+from runlog import append_run, capture_run, run_record
+from thumbnails import ThumbnailCache
+from engine import (
+    DEFAULT_BATCH_WORKERS,
+    DEFAULT_VALIDATION_WORKERS,
+    DEFAULT_OUTPUT_PROFILE,
+    DEFAULT_WORKER_MEMORY_MB,
+    OUTPUT_PROFILES,
+    PAGE_MODES,
+    capture_dir,
+    data_dir,
+    ensure_output_dir,
+    ensure_pdf_extension,
+    input_base_name,
+    is_zip_file,
+    layout_fun_for_mode,
+    output_path_for_input,
+    run_batch,
+    run_log_dir,
+    scan_images,
+    scan_zip_images,
+    write_images_pdf,
+    write_volumes,
+)
 
-from PIL import Image, ImageTk
-import img2pdf
 
-
-SUPPORTED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif"}
-A4_SIZE_PT = (img2pdf.mm_to_pt(210), img2pdf.mm_to_pt(297))
 APP_VERSION = "0.1.11"
 UPDATE_API_URL = "https://api.github.com/repos/okurawave/pdfmaker/releases/latest"
 UPDATE_ASSET_NAME = "pdfmaker-setup.exe"
-FULLWIDTH_TO_ASCII = str.maketrans("０１２３４５６７８９", "0123456789")
-
-
-def natural_sort_key(value: str) -> list:
-    normalized = value.translate(FULLWIDTH_TO_ASCII)
-    parts = re.split(r"(\d+)", normalized)
-    key = []
-    for part in parts:
-        if part.isdigit():
-            key.append(int(part))
-        else:
-            key.append(part.lower())
-    return key
+PREFETCH_NEIGHBORS = 2
+INFO_PREFETCH_LIMIT = 500
+PROGRESS_POLL_MS = 100
+DND_SETUP_DELAY_MS = 100
+STARTUP_REPORT_FLAG = "--startup-report"
+CLOSE_WAIT_SECONDS = 5
+BUILD_OPTION_KEYS = (
+    "page_mode",
+    "workers",
+    "max_bytes",
+    "profile",
+    "hash_contents",
+    "append",
+    "volume_pages",
+    "volume_mb",
+    "capture",
+)
 
 
 class App:
@@ -52,27 +71,44 @@ class App:
         self.status_text = tk.StringVar(value="Select a folder to begin.")
         self.progress_text = tk.StringVar(value="")
         self.page_mode = tk.StringVar(value="A4 (fit)")
+        self.output_profile = tk.StringVar(value=DEFAULT_OUTPUT_PROFILE)
         self.use_fixed_output = tk.BooleanVar(value=True)
         self.fixed_output_dir = tk.StringVar(value=default_output_dir())
         self.batch_mode = tk.BooleanVar(value=False)
+        self.append_mode = tk.BooleanVar(value=False)
+        self.watch_mode = tk.BooleanVar(value=False)
+        self.validation_workers = tk.IntVar(value=DEFAULT_VALIDATION_WORKERS)
+        self.batch_workers = tk.IntVar(value=DEFAULT_BATCH_WORKERS)
+        self.worker_memory_mb = tk.IntVar(value=DEFAULT_WORKER_MEMORY_MB)
+        self.hash_batch_inputs = tk.BooleanVar(value=False)
+        self.volume_pages = tk.IntVar(value=0)
+        self.volume_mb = tk.IntVar(value=0)
+        self.capture_profiles = tk.BooleanVar(value=False)
 
         self.images = []
-        self.display_names = []
         self.batch_folders = []
-        self.input_is_zip = False
-        self.active_folder = ""
-        self.temp_dir = None
         self.preview_image = None
+        self.job_queue = JobQueue()
+        self.progress_job = None
+        self.progress_version = -1
+        self.polling = False
+        self.watcher = None
+        self.stopping_watcher = None
+        self.watch_pending = False
+        self.info_channel = None
+        self.close_deadline = None
+        self.thumbnails = ThumbnailCache(thumbnail_cache_dir())
 
         self.load_settings()
         self._build_ui()
-        self._setup_dnd()
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(DND_SETUP_DELAY_MS, self._setup_dnd)
         self.root.after(600, self.start_update_check)
 
     def _build_ui(self) -> None:
         container = ttk.Frame(self.root, padding=12)
         container.grid(row=0, column=0, sticky="nsew")
+        self.container = container
 
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
@@ -115,13 +151,28 @@ class App:
         page_label = ttk.Label(container, text="Page size")
         page_label.grid(row=3, column=0, sticky="w", pady=(4, 6))
 
+        page_frame = ttk.Frame(container)
+        page_frame.grid(row=3, column=1, sticky="w", pady=(4, 6))
+
         page_mode = ttk.Combobox(
-            container,
+            page_frame,
             textvariable=self.page_mode,
             state="readonly",
-            values=["A4 (fit)", "A4 (no upscale)", "Original size"],
+            values=PAGE_MODES,
+        )
+        page_mode.grid(row=0, column=0, sticky="w")
+
+        profile_label = ttk.Label(page_frame, text="Quality")
+        profile_label.grid(row=0, column=1, sticky="w", padx=(12, 4))
+
+        profile = ttk.Combobox(
+            page_frame,
+            textvariable=self.output_profile,
+            state="readonly",
+            values=OUTPUT_PROFILES,
+            width=16,
         )
-        page_mode.grid(row=3, column=1, sticky="w", pady=(4, 6))
+        profile.grid(row=0, column=2, sticky="w")
 
         info = ttk.Label(
             container,
@@ -160,6 +211,21 @@ class App:
         )
         self.clear_batch_button.grid(row=0, column=2, padx=(6, 0))
 
+        append_check = ttk.Checkbutton(
+            batch_frame,
+            text="Append new images",
+            variable=self.append_mode,
+        )
+        append_check.grid(row=0, column=3, sticky="w", padx=(12, 0))
+
+        watch_check = ttk.Checkbutton(
+            batch_frame,
+            text="Watch folders",
+            variable=self.watch_mode,
+            command=self.toggle_watch,
+        )
+        watch_check.grid(row=0, column=4, sticky="w", padx=(12, 0))
+
         reorder_frame = ttk.Frame(controls_frame)
         reorder_frame.grid(row=0, column=1, sticky="e")
 
@@ -169,13 +235,11 @@ class App:
         self.move_down_button = ttk.Button(reorder_frame, text="Down", command=lambda: self.move_selected(1))
         self.move_down_button.grid(row=0, column=1)
 
-        self.listbox = tk.Listbox(list_frame, height=12)
-        self.listbox.grid(row=1, column=0, sticky="nsew")
+        self.listbox = VirtualList(list_frame, height=12)
+        self.listbox.grid(row=1, column=0, columnspan=2, sticky="nsew")
         self.listbox.bind("<<ListboxSelect>>", self.on_select_image)
-
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.listbox.yview)
-        scrollbar.grid(row=1, column=1, sticky="ns")
-        self.listbox.configure(yscrollcommand=scrollbar.set)
+        self.listbox.canvas.bind("<Control-Up>", lambda event: self.move_selected(-1) or "break")
+        self.listbox.canvas.bind("<Control-Down>", lambda event: self.move_selected(1) or "break")
 
         preview_frame = ttk.Labelframe(container, text="Preview")
         preview_frame.grid(row=4, column=2, sticky="nsew", padx=(8, 0))
@@ -195,8 +259,12 @@ class App:
         self.status_label.grid(row=7, column=0, columnspan=3, sticky="w")
 
         self.create_button = ttk.Button(container, text="Create PDF", command=self.create_pdf)
-        self.create_button.grid(row=8, column=0, columnspan=3, sticky="ew", pady=(10, 0))
+        self.create_button.grid(row=8, column=0, columnspan=2, sticky="ew", pady=(10, 0))
         self.create_button.state(["disabled"])
+
+        self.cancel_button = ttk.Button(container, text="Cancel", command=self.cancel_job)
+        self.cancel_button.grid(row=8, column=2, sticky="ew", padx=(8, 0), pady=(10, 0))
+        self.cancel_button.state(["disabled"])
         self.update_output_controls()
 
         version_label = ttk.Label(container, text=f"v{APP_VERSION}", foreground="#666666")
@@ -204,13 +272,16 @@ class App:
         self.on_mode_change()
 
     def _setup_dnd(self) -> None:
-        if not TkinterDnD or not DND_FILES:
+        try:
+            from tkinterdnd2 import DND_FILES, TkinterDnD
+        except ImportError:
             return
         try:
-            self.root.drop_target_register(DND_FILES)
-            self.root.dnd_bind("<<Drop>>", self.on_drop)
-        except Exception:
-            pass
+            TkinterDnD.require(self.root)
+            self.container.drop_target_register(DND_FILES)
+            self.container.dnd_bind("<<Drop>>", self.on_drop)
+        except (tk.TclError, RuntimeError, AttributeError) as exc:
+            self.status_text.set(f"Drag and drop unavailable: {exc}")
 
     def select_folder(self) -> None:
         path = filedialog.askdirectory()
@@ -250,7 +321,7 @@ class App:
             return
         norm_paths = [os.path.normpath(p) for p in paths]
         folders = [p for p in norm_paths if os.path.isdir(p)]
-        zips = [p for p in norm_paths if self._is_zip_file(p)]
+        zips = [p for p in norm_paths if is_zip_file(p)]
         if self.batch_mode.get() or len(folders) > 1:
             for folder in folders:
                 self.add_batch_folder(folder)
@@ -262,121 +333,59 @@ class App:
         elif zips:
             self.set_input(zips[0])
 
-    def _is_zip_file(self, path: str) -> bool:
-        return os.path.isfile(path) and path.lower().endswith(".zip")
-
-    def _clear_temp_dir(self) -> None:
-        if self.temp_dir:
-            try:
-                self.temp_dir.cleanup()
-            except Exception:
-                pass
-            self.temp_dir = None
-
     def set_input(self, path: str) -> None:
-        self._clear_temp_dir()
-        self.input_is_zip = False
-        self.active_folder = ""
-
-        if self._is_zip_file(path):
+        if is_zip_file(path):
             try:
-                temp_dir = tempfile.TemporaryDirectory(prefix="pdfmaker_zip_")
-                with zipfile.ZipFile(path, "r") as zf:
-                    zf.extractall(temp_dir.name)
-                self.temp_dir = temp_dir
-                self.input_is_zip = True
-                self.active_folder = temp_dir.name
+                images = scan_zip_images(path)
             except Exception as exc:
-                self._clear_temp_dir()
                 messagebox.showerror("Error", f"Failed to read zip file: {exc}")
                 return
         elif os.path.isdir(path):
-            self.active_folder = path
+            images = self.collect_images(path)
         else:
             messagebox.showwarning("Input", "Please select a folder or a zip file.")
             return
 
         self.folder_path.set(path)
-        self.load_images(self.active_folder, recursive=self.input_is_zip)
+        self.images = images
+        self.refresh_list()
+        self.update_status()
         self.apply_output_path()
+        if self.info_channel is not None:
+            self.info_channel.cancel()
+        self.info_channel = ProgressChannel()
+        sources = [record.source for record in images[:INFO_PREFETCH_LIMIT]]
+        thread = threading.Thread(
+            target=prefetch_info,
+            args=(sources, self._validation_worker_count(), self.info_channel),
+            daemon=True,
+        )
+        thread.start()
 
     def default_output_path(self, folder: str) -> str:
         base = os.path.basename(os.path.normpath(folder)) or "output"
         return os.path.join(folder, f"{base}.pdf")
 
-    def _input_base_name(self, path: str) -> str:
-        base = os.path.basename(os.path.normpath(path)) or "output"
-        if self._is_zip_file(path):
-            base = os.path.splitext(base)[0] or "output"
-        return base
-
-    def _input_output_dir(self, path: str) -> str:
-        if self._is_zip_file(path):
-            return os.path.dirname(path)
-        return path
-
     def apply_output_path(self) -> None:
         input_path = self.folder_path.get().strip()
         if not input_path:
             return
-        base = self._input_base_name(input_path)
-        if self.use_fixed_output.get() and self.fixed_output_dir.get().strip():
-            output_dir = self.fixed_output_dir.get().strip()
-        else:
-            output_dir = self._input_output_dir(input_path)
-        self.output_path.set(os.path.join(output_dir, f"{base}.pdf"))
+        self.output_path.set(self._output_path_for_input(input_path))
 
-    def collect_images(self, folder: str, recursive: bool = False) -> tuple[list, list]:
+    def collect_images(self, folder: str) -> list:
         try:
-            entries = os.listdir(folder)
+            return scan_images(folder)
         except OSError as exc:
             messagebox.showerror("Error", f"Failed to read folder: {exc}")
-            return [], []
-
-        images = []
-        display_names = []
-        if recursive:
-            for root, _, files in os.walk(folder):
-                for name in files:
-                    ext = os.path.splitext(name)[1].lower()
-                    if ext in SUPPORTED_EXTENSIONS:
-                        path = os.path.join(root, name)
-                        images.append(path)
-                        display_names.append(os.path.relpath(path, folder))
-            if images:
-                images, display_names = zip(
-                    *sorted(zip(images, display_names), key=lambda t: natural_sort_key(t[1]))
-                )
-        else:
-            for name in entries:
-                ext = os.path.splitext(name)[1].lower()
-                if ext in SUPPORTED_EXTENSIONS:
-                    images.append(os.path.join(folder, name))
-                    display_names.append(name)
-            if images:
-                images, display_names = zip(
-                    *sorted(zip(images, display_names), key=lambda t: natural_sort_key(t[1]))
-                )
-
-        return list(images) if images else [], list(display_names) if display_names else []
-
-    def load_images(self, folder: str, recursive: bool = False) -> None:
-        images, display_names = self.collect_images(folder, recursive=recursive)
-        self.images = images
-        self.display_names = display_names
-        self.refresh_list()
-        self.update_status()
+            return []
 
     def refresh_list(self) -> None:
-        self.listbox.delete(0, tk.END)
         if self.batch_mode.get():
-            for path in self.batch_folders:
-                self.listbox.insert(tk.END, path)
+            self.listbox.set_items(self.batch_folders)
         else:
-            for name in self.display_names:
-                self.listbox.insert(tk.END, name)
+            self.listbox.set_items(self.images, label=lambda record: record.name)
         if not self.batch_mode.get() and self.images:
-            self.listbox.selection_set(0)
+            self.listbox.set_selection([0])
             self.on_select_image()
         else:
             self.preview_label.configure(text="No image selected", image="")
@@ -397,6 +406,18 @@ class App:
             else:
                 self.status_text.set(f"{len(self.images)} image(s) ready.")
                 self.create_button.state(["!disabled"])
+        job = self.job_queue.current
+        if job is None:
+            self.cancel_button.state(["disabled"])
+            if self.watcher is not None:
+                self.status_text.set(f"Watching {len(self.watcher.outputs)} folder(s) for new images.")
+            return
+        self.cancel_button.state(["!disabled"])
+        queued = self.job_queue.queued()
+        status = f"Generating {job.name}..."
+        if queued:
+            status += f" ({queued} queued)"
+        self.status_text.set(status)
 
     def on_select_image(self, event: tk.Event | None = None) -> None:
         if self.batch_mode.get():
@@ -404,31 +425,26 @@ class App:
         selection = self.listbox.curselection()
         if not selection:
             return
-        path = self.images[selection[0]]
-        self.update_preview(path)
-
-    def update_preview(self, path: str) -> None:
-        try:
-            with Image.open(path) as img:
-                img_copy = img.copy()
-        except Exception:
+        index = selection[0]
+        self.update_preview(self.images[index].source)
+        start = max(0, index - PREFETCH_NEIGHBORS)
+        neighbors = self.images[start:index] + self.images[index + 1 : index + 1 + PREFETCH_NEIGHBORS]
+        self.thumbnails.prefetch([record.source for record in neighbors])
+
+    def update_preview(self, path) -> None:
+        thumb = self.thumbnails.get(path)
+        if thumb is None:
             self.preview_label.configure(text="Preview unavailable", image="")
             self.preview_image = None
             return
 
-        max_width = 280
-        max_height = 360
-        img_copy.thumbnail((max_width, max_height))
-        self.preview_image = ImageTk.PhotoImage(img_copy)
+        from PIL import ImageTk
+
+        self.preview_image = ImageTk.PhotoImage(thumb)
         self.preview_label.configure(image=self.preview_image, text="")
 
     def get_layout_fun(self):
-        mode = self.page_mode.get()
-        if mode == "A4 (no upscale)":
-            return img2pdf.get_layout_fun(A4_SIZE_PT, fit=img2pdf.FitMode.shrink)
-        if mode == "Original size":
-            return img2pdf.get_layout_fun()
-        return img2pdf.get_layout_fun(A4_SIZE_PT, fit=img2pdf.FitMode.into)
+        return layout_fun_for_mode(self.page_mode.get())
 
     def create_pdf(self) -> None:
         output = self.output_path.get().strip()
@@ -436,17 +452,17 @@ class App:
             messagebox.showwarning("Output Folder", "Set a fixed output folder in Settings.")
             self.open_settings()
             return
+        options = self._job_options()
         if self.batch_mode.get():
             if not self.batch_folders:
                 messagebox.showwarning("No Folders", "No folders selected for batch.")
                 return
-            self.create_button.state(["disabled"])
-            self.progress.stop()
-            self.progress.configure(value=0, maximum=len(self.batch_folders))
-            self.status_text.set("Generating PDFs...")
-            self.progress_text.set("Preparing batch...")
-            thread = threading.Thread(target=self._generate_batch_thread, daemon=True)
-            thread.start()
+            folders = list(self.batch_folders)
+            jobs = [(folder, ensure_pdf_extension(self._output_path_for_input(folder))) for folder in folders]
+            self._submit_job(
+                f"batch of {len(folders)} folder(s)",
+                lambda channel: self._generate_batch_thread(jobs, options, channel),
+            )
             return
 
         if not self.images:
@@ -458,107 +474,171 @@ class App:
             if not output:
                 return
 
-        output = self._ensure_pdf_extension(output)
+        output = ensure_pdf_extension(output)
         self.output_path.set(output)
-        self._ensure_output_dir(output)
+        ensure_output_dir(output)
 
-        self.create_button.state(["disabled"])
-        self.progress.stop()
-        self.progress.configure(value=0, maximum=len(self.images))
-        self.status_text.set("Generating PDF...")
-        self.progress_text.set("Preparing...")
+        input_path = self.folder_path.get()
+        images = [record.source for record in self.images]
+        self._submit_job(
+            os.path.basename(output),
+            lambda channel: self._generate_pdf_thread(input_path, output, images, options, channel),
+        )
 
-        thread = threading.Thread(target=self._generate_pdf_thread, args=(output,), daemon=True)
-        thread.start()
+    def _job_options(self) -> dict:
+        return {
+            "page_mode": self.page_mode.get(),
+            "profile": self.output_profile.get(),
+            "workers": self._validation_worker_count(),
+            "batch_workers": self._int_setting(self.batch_workers, DEFAULT_BATCH_WORKERS),
+            "max_bytes": self._int_setting(self.worker_memory_mb, DEFAULT_WORKER_MEMORY_MB) * 1024 * 1024,
+            "hash_contents": self.hash_batch_inputs.get(),
+            "append": self.append_mode.get(),
+            "volume_pages": self._limit_setting(self.volume_pages),
+            "volume_mb": self._limit_setting(self.volume_mb),
+            "capture": self.capture_profiles.get(),
+        }
 
-    def _generate_pdf_thread(self, output: str) -> None:
-        valid_images, warnings = self._validate_images(self.images)
-        if not valid_images:
+    def _submit_job(self, name: str, target) -> None:
+        if not self.job_queue.busy:
+            self.progress.stop()
+            self.progress.configure(value=0, maximum=1)
+            self.progress_text.set("Preparing...")
+        self.job_queue.submit(name, target)
+        self.update_status()
+        if not self.polling:
+            self.polling = True
+            self.root.after(PROGRESS_POLL_MS, self._poll_progress)
+
+    def cancel_job(self) -> None:
+        self.job_queue.cancel_current()
+        self.progress_text.set("Cancelling...")
+
+    def _poll_progress(self) -> None:
+        job = self.job_queue.current
+        if job is None:
+            self.polling = False
+            self.update_status()
+            return
+        if job is not self.progress_job:
+            self.progress_job = job
+            self.progress_version = -1
+            self.update_status()
+        state = job.channel.snapshot()
+        if state["version"] != self.progress_version and not job.channel.cancelled:
+            self.progress_version = state["version"]
+            message = state["message"]
+            timings = format_stage_times(state["stage_times"])
+            if timings:
+                message = f"{message}  ({timings})" if message else timings
+            self._update_progress(state["value"], state["total"], message)
+        self.root.after(PROGRESS_POLL_MS, self._poll_progress)
+
+    def _generate_pdf_thread(
+        self, input_path: str, output: str, images: list, options: dict, channel: ProgressChannel
+    ) -> None:
+        start = time.perf_counter()
+        with capture_run(capture_dir() if options["capture"] else None, input_base_name(input_path)) as captures:
+            result = self._write_pdf(output, images, options, channel)
+        outputs, pages, warnings = result or ([output], 0, [])
+        if result is None:
+            status = "Cancelled" if channel.cancelled else "Failed"
+        else:
+            status = "OK" if pages else "No valid images found."
+        report = dict(channel.report(), input=input_path, outputs=outputs, status=status, pages=pages)
+        report["warnings"] = warnings
+        if captures:
+            report["captures"] = captures
+        append_run(run_log_dir(), run_record("single", [report], time.perf_counter() - start, options))
+        if result is None:
+            return
+        if not pages:
             self.root.after(0, lambda: self._on_generation_failed("No valid images found."))
             return
-        if not self._write_pdf(output, valid_images):
+        self.root.after(0, lambda: self._on_generation_success(", ".join(outputs), warnings, options["append"]))
+
+    def _generate_batch_thread(self, jobs: list, options: dict, channel: ProgressChannel) -> None:
+        total = len(jobs)
+        channel.update(0, total, f"Processing 0/{total}")
+        start = time.perf_counter()
+        batch_results = run_batch(
+            jobs,
+            options["page_mode"],
+            processes=options["batch_workers"],
+            workers=options["workers"],
+            max_bytes=options["max_bytes"],
+            progress=channel,
+            profile=options["profile"],
+            hash_contents=options["hash_contents"],
+            append=options["append"],
+            volume_pages=options["volume_pages"],
+            volume_mb=options["volume_mb"],
+            capture=options["capture"],
+        )
+        log_path = append_run(
+            run_log_dir(), run_record("batch", batch_results, time.perf_counter() - start, options)
+        )
+        if channel.cancelled:
+            self.root.after(0, self._on_generation_cancelled)
             return
-        self.root.after(0, lambda: self._on_generation_success(output, warnings))
-
-    def _generate_batch_thread(self) -> None:
-        results = []
-        total = len(self.batch_folders)
-        for index, folder in enumerate(self.batch_folders, start=1):
-            self.root.after(
-                0,
-                lambda i=index, t=total, f=folder: self._update_progress(
-                    i, t, f"Processing {i}/{t}: {os.path.basename(f)}"
-                ),
-            )
-            images, _ = self.collect_images(folder, recursive=False)
-            if not images:
-                results.append((folder, "No supported images found."))
-                continue
-            valid_images, warnings = self._validate_images(images)
-            if not valid_images:
-                results.append((folder, "No valid images found."))
-                continue
-
-            output = self._output_path_for_input(folder)
-            output = self._ensure_pdf_extension(output)
-            self._ensure_output_dir(output)
-            if not self._write_pdf(output, valid_images):
-                results.append((folder, "Failed to write PDF."))
-                continue
-            if warnings:
-                results.append((folder, f"Skipped {len(warnings)} unreadable file(s)."))
-            else:
-                results.append((folder, "OK"))
-
-        self.root.after(0, lambda: self._on_batch_complete(results))
+        results = [(folder, result["status"]) for (folder, _), result in zip(jobs, batch_results)]
+        self.root.after(0, lambda: self._on_batch_complete(results, log_path))
 
     def _output_path_for_input(self, input_path: str) -> str:
-        base = self._input_base_name(input_path)
-        if self.use_fixed_output.get() and self.fixed_output_dir.get().strip():
+        output_dir = ""
+        if self.use_fixed_output.get():
             output_dir = self.fixed_output_dir.get().strip()
-        else:
-            output_dir = self._input_output_dir(input_path)
-        return os.path.join(output_dir, f"{base}.pdf")
+        return output_path_for_input(input_path, output_dir)
 
-    def _ensure_pdf_extension(self, output: str) -> str:
-        return output if output.lower().endswith(".pdf") else output + ".pdf"
+    def _validation_worker_count(self) -> int:
+        return self._int_setting(self.validation_workers, DEFAULT_VALIDATION_WORKERS)
 
-    def _ensure_output_dir(self, output: str) -> None:
+    def _int_setting(self, var: tk.IntVar, default: int) -> int:
         try:
-            os.makedirs(os.path.dirname(output), exist_ok=True)
-        except Exception:
-            pass
+            return max(1, int(var.get()))
+        except (tk.TclError, ValueError):
+            return default
 
-    def _validate_images(self, images: list) -> tuple[list, list]:
-        warnings = []
-        valid_images = []
-        total = len(images)
-        for index, path in enumerate(images, start=1):
-            self.root.after(
-                0,
-                lambda i=index, p=path, t=total: self._update_progress(
-                    i, t, f"Checking {i}/{t}: {os.path.basename(p)}"
-                ),
-            )
-            try:
-                with Image.open(path) as img:
-                    img.verify()
-                valid_images.append(path)
-            except Exception:
-                warnings.append(os.path.basename(path))
-        return valid_images, warnings
-
-    def _write_pdf(self, output: str, images: list) -> bool:
+    def _limit_setting(self, var: tk.IntVar) -> int:
+        try:
+            return max(0, int(var.get()))
+        except (tk.TclError, ValueError):
+            return 0
+
+    def _write_pdf(
+        self, output: str, images: list, options: dict, channel: ProgressChannel
+    ) -> tuple[list, int, list] | None:
         try:
-            layout_fun = self.get_layout_fun()
-            self.root.after(0, lambda: self._update_progress(len(images), len(images), "Generating PDF..."))
-            pdf_bytes = img2pdf.convert(images, layout_fun=layout_fun)
-            with open(output, "wb") as f:
-                f.write(pdf_bytes)
-            return True
+            if options["volume_pages"] or options["volume_mb"]:
+                return write_volumes(
+                    output,
+                    images,
+                    options["page_mode"],
+                    workers=options["workers"],
+                    max_bytes=options["max_bytes"],
+                    progress=channel,
+                    profile=options["profile"],
+                    volume_pages=options["volume_pages"],
+                    volume_mb=options["volume_mb"],
+                )
+            pages, warnings = write_images_pdf(
+                output,
+                images,
+                options["page_mode"],
+                workers=options["workers"],
+                max_bytes=options["max_bytes"],
+                progress=channel,
+                profile=options["profile"],
+                append=options["append"],
+            )
+            return [output], pages, warnings
+        except JobCancelled:
+            self.root.after(0, self._on_generation_cancelled)
+            return None
         except Exception as exc:
-            self.root.after(0, lambda: self._on_generation_failed(str(exc)))
-            return False
+            message = str(exc)
+            self.root.after(0, lambda: self._on_generation_failed(message))
+            return None
 
     def start_update_check(self) -> None:
         thread = threading.Thread(target=self._check_update_thread, daemon=True)
@@ -607,13 +687,17 @@ class App:
             temp_path = download_file(download_url)
             self.root.after(0, lambda: self._apply_update(temp_path))
         except Exception as exc:
-            self.root.after(0, lambda: self._on_update_failed(str(exc)))
+            message = str(exc)
+            self.root.after(0, lambda: self._on_update_failed(message))
 
     def _apply_update(self, temp_path: str) -> None:
         if not getattr(sys, "frozen", False):
             self._on_update_failed("Auto-update is only available in the packaged app.")
             return
 
+        import subprocess
+        import tempfile
+
         target_exe = sys.executable
         updater_path = os.path.join(tempfile.gettempdir(), "pdfmaker_update.bat")
         pid = os.getpid()
@@ -659,7 +743,12 @@ class App:
         self.update_status()
         messagebox.showerror("Error", f"Failed to create PDF: {message}")
 
-    def _on_generation_success(self, output: str, warnings: list) -> None:
+    def _on_generation_cancelled(self) -> None:
+        self.progress.stop()
+        self.progress_text.set("Cancelled.")
+        self.update_status()
+
+    def _on_generation_success(self, output: str, warnings: list, append: bool = False) -> None:
         self.progress.stop()
         self.progress_text.set("")
         self.update_status()
@@ -672,18 +761,23 @@ class App:
             if extra:
                 warning_text += f"\n... and {extra} more"
 
-        messagebox.showinfo("Done", f"PDF created: {output}{warning_text}")
+        verb = "updated" if append else "created"
+        messagebox.showinfo("Done", f"PDF {verb}: {output}{warning_text}")
 
-    def _on_batch_complete(self, results: list) -> None:
+    def _on_batch_complete(self, results: list, log_path: str) -> None:
         self.progress.stop()
         self.progress_text.set("")
         self.update_status()
 
         ok = [r for r in results if r[1] == "OK"]
-        errors = [r for r in results if r[1] != "OK"]
+        up_to_date = [r for r in results if r[1] == "Up to date"]
+        errors = [r for r in results if r[1] not in ("OK", "Up to date")]
         lines = [f"{os.path.basename(path)}: {status}" for path, status in results]
         summary = f"Completed {len(ok)}/{len(results)} folder(s)."
-        messagebox.showinfo("Batch Done", summary + "\n\n" + "\n".join(lines))
+        if up_to_date:
+            summary += f" {len(up_to_date)} up to date."
+        report = f"\n\nRun report: {log_path}"
+        messagebox.showinfo("Batch Done", summary + "\n\n" + "\n".join(lines) + report)
 
     def _update_progress(self, value: int, total: int, message: str) -> None:
         self.progress.configure(maximum=max(total, 1))
@@ -715,11 +809,55 @@ class App:
         browse_button = ttk.Button(frame, text="Browse", command=self.select_fixed_output_folder)
         browse_button.grid(row=1, column=2, padx=(8, 0), pady=(8, 4))
 
+        workers_label = ttk.Label(frame, text="Validation threads")
+        workers_label.grid(row=2, column=0, sticky="w", pady=4)
+
+        workers_spin = ttk.Spinbox(frame, from_=1, to=64, width=6, textvariable=self.validation_workers)
+        workers_spin.grid(row=2, column=1, sticky="w", pady=4)
+
+        batch_label = ttk.Label(frame, text="Batch processes")
+        batch_label.grid(row=3, column=0, sticky="w", pady=4)
+
+        batch_spin = ttk.Spinbox(frame, from_=1, to=64, width=6, textvariable=self.batch_workers)
+        batch_spin.grid(row=3, column=1, sticky="w", pady=4)
+
+        memory_label = ttk.Label(frame, text="Memory per process (MB)")
+        memory_label.grid(row=4, column=0, sticky="w", pady=4)
+
+        memory_spin = ttk.Spinbox(frame, from_=64, to=65536, increment=64, width=8, textvariable=self.worker_memory_mb)
+        memory_spin.grid(row=4, column=1, sticky="w", pady=4)
+
+        hash_check = ttk.Checkbutton(
+            frame,
+            text="Compare file contents when skipping unchanged batch folders",
+            variable=self.hash_batch_inputs,
+        )
+        hash_check.grid(row=5, column=0, columnspan=3, sticky="w", pady=4)
+
+        volume_pages_label = ttk.Label(frame, text="Pages per PDF (0 = no limit)")
+        volume_pages_label.grid(row=6, column=0, sticky="w", pady=4)
+
+        volume_pages_spin = ttk.Spinbox(frame, from_=0, to=100000, increment=100, width=8, textvariable=self.volume_pages)
+        volume_pages_spin.grid(row=6, column=1, sticky="w", pady=4)
+
+        volume_mb_label = ttk.Label(frame, text="MB per PDF (0 = no limit)")
+        volume_mb_label.grid(row=7, column=0, sticky="w", pady=4)
+
+        volume_mb_spin = ttk.Spinbox(frame, from_=0, to=100000, increment=100, width=8, textvariable=self.volume_mb)
+        volume_mb_spin.grid(row=7, column=1, sticky="w", pady=4)
+
+        capture_check = ttk.Checkbutton(
+            frame,
+            text="Save CPU and memory profiles of each job (slower)",
+            variable=self.capture_profiles,
+        )
+        capture_check.grid(row=8, column=0, columnspan=3, sticky="w", pady=4)
+
         update_button = ttk.Button(frame, text="Check for updates", command=self.check_updates_now)
-        update_button.grid(row=2, column=0, columnspan=3, sticky="ew", pady=(10, 0))
+        update_button.grid(row=9, column=0, columnspan=3, sticky="ew", pady=(10, 0))
 
         save_button = ttk.Button(frame, text="Save", command=lambda: self.save_settings_and_close(dialog))
-        save_button.grid(row=3, column=0, columnspan=3, sticky="ew", pady=(6, 0))
+        save_button.grid(row=10, column=0, columnspan=3, sticky="ew", pady=(6, 0))
 
         dialog.transient(self.root)
         dialog.grab_set()
@@ -759,6 +897,13 @@ class App:
         if not fixed_dir:
             fixed_dir = default_output_dir()
         self.fixed_output_dir.set(fixed_dir)
+        self.validation_workers.set(read_int(data, "validation_workers", DEFAULT_VALIDATION_WORKERS))
+        self.batch_workers.set(read_int(data, "batch_workers", DEFAULT_BATCH_WORKERS))
+        self.worker_memory_mb.set(read_int(data, "worker_memory_mb", DEFAULT_WORKER_MEMORY_MB))
+        self.hash_batch_inputs.set(bool(data.get("hash_batch_inputs", False)))
+        self.volume_pages.set(read_int(data, "volume_pages", 0, minimum=0))
+        self.volume_mb.set(read_int(data, "volume_mb", 0, minimum=0))
+        self.capture_profiles.set(bool(data.get("capture_profiles", False)))
 
     def save_settings(self) -> None:
         path = settings_path()
@@ -766,12 +911,90 @@ class App:
         data = {
             "use_fixed_output": self.use_fixed_output.get(),
             "fixed_output_dir": self.fixed_output_dir.get(),
+            "validation_workers": self._validation_worker_count(),
+            "batch_workers": self._int_setting(self.batch_workers, DEFAULT_BATCH_WORKERS),
+            "worker_memory_mb": self._int_setting(self.worker_memory_mb, DEFAULT_WORKER_MEMORY_MB),
+            "hash_batch_inputs": self.hash_batch_inputs.get(),
+            "volume_pages": self._limit_setting(self.volume_pages),
+            "volume_mb": self._limit_setting(self.volume_mb),
+            "capture_profiles": self.capture_profiles.get(),
         }
         with open(path, "w", encoding="ascii") as f:
             json.dump(data, f)
 
+    def toggle_watch(self) -> None:
+        if self.watcher is not None:
+            self.watcher.stop(0)
+            self.stopping_watcher = self.watcher
+            self.watcher = None
+        if self.watch_mode.get() and (not self.batch_mode.get() or not self.batch_folders):
+            messagebox.showwarning("Watch Folders", "Add folders in batch mode to watch them.")
+            self.watch_mode.set(False)
+        if not self.watch_pending:
+            self._start_watcher()
+        self.update_status()
+
+    def _start_watcher(self) -> None:
+        self.watch_pending = False
+        if self.stopping_watcher is not None and self.stopping_watcher.thread.is_alive():
+            self.watch_pending = True
+            self.root.after(PROGRESS_POLL_MS, self._start_watcher)
+            return
+        self.stopping_watcher = None
+        if self.watcher is not None or self.close_deadline is not None or not self.watch_mode.get():
+            return
+        if not self.batch_mode.get() or not self.batch_folders:
+            return
+        from watch import FolderWatcher
+
+        options = self._job_options()
+        jobs = [
+            (folder, ensure_pdf_extension(self._output_path_for_input(folder)))
+            for folder in self.batch_folders
+        ]
+        self.watcher = FolderWatcher(
+            jobs,
+            {key: options[key] for key in BUILD_OPTION_KEYS},
+            processes=options["batch_workers"],
+            on_result=lambda result: self.root.after(0, lambda: self._on_watch_result(result)),
+        )
+        self.watcher.start()
+        self.update_status()
+
+    def refresh_watch(self) -> None:
+        if self.watch_mode.get():
+            self.watch_mode.set(bool(self.batch_mode.get() and self.batch_folders))
+            self.toggle_watch()
+
+    def _on_watch_result(self, result: dict) -> None:
+        if result.get("up_to_date") or self.watcher is None:
+            return
+        self.status_text.set(f"{os.path.basename(result['input'])}: {result['status']}")
+
     def on_close(self) -> None:
-        self._clear_temp_dir()
+        if self.close_deadline is not None:
+            return
+        if self.job_queue.busy:
+            if not messagebox.askyesno("Exit", "A PDF is still being generated. Cancel it and exit?"):
+                return
+            self.job_queue.cancel_all()
+            self.status_text.set("Cancelling...")
+        if self.watcher is not None:
+            self.watcher.stop(0)
+        if self.info_channel is not None:
+            self.info_channel.cancel()
+        self.close_deadline = time.monotonic() + CLOSE_WAIT_SECONDS
+        self._finish_close()
+
+    def _finish_close(self) -> None:
+        watching = any(
+            watcher is not None and watcher.thread is not None and watcher.thread.is_alive()
+            for watcher in (self.watcher, self.stopping_watcher)
+        )
+        if (self.job_queue.busy or watching) and time.monotonic() < self.close_deadline:
+            self.root.after(PROGRESS_POLL_MS, self._finish_close)
+            return
+        self.thumbnails.close()
         self.root.destroy()
 
     def on_mode_change(self) -> None:
@@ -780,6 +1003,7 @@ class App:
             self.preview_image = None
         self.refresh_list()
         self.update_output_controls()
+        self.refresh_watch()
         self.update_status()
 
     def add_batch_folder(self, path: str | None = None) -> None:
@@ -793,30 +1017,30 @@ class App:
         if path not in self.batch_folders:
             self.batch_folders.append(path)
         self.refresh_list()
+        self.refresh_watch()
         self.update_status()
 
     def clear_batch_folders(self) -> None:
         self.batch_folders = []
         self.refresh_list()
+        self.refresh_watch()
         self.update_status()
 
     def move_selected(self, direction: int) -> None:
-        selection = self.listbox.curselection()
+        selection = list(self.listbox.curselection())
         if not selection:
             return
-        index = selection[0]
         items = self.batch_folders if self.batch_mode.get() else self.images
-        names = None if self.batch_mode.get() else self.display_names
         if not items:
             return
-        new_index = index + direction
-        if new_index < 0 or new_index >= len(items):
+        if selection[0] + direction < 0 or selection[-1] + direction >= len(items):
             return
-        items[index], items[new_index] = items[new_index], items[index]
-        if names is not None:
-            names[index], names[new_index] = names[new_index], names[index]
-        self.refresh_list()
-        self.listbox.selection_set(new_index)
+        for index in selection if direction < 0 else reversed(selection):
+            items[index], items[index + direction] = items[index + direction], items[index]
+        moved = [index + direction for index in selection]
+        active = moved[0] if direction < 0 else moved[-1]
+        self.listbox.set_selection(moved, active)
+        self.listbox.see(active)
         if not self.batch_mode.get():
             self.on_select_image()
 
@@ -838,7 +1062,8 @@ class App:
             else:
                 self.root.after(0, lambda: self._on_update_check_complete("No updates available."))
         except Exception as exc:
-            self.root.after(0, lambda: self._on_update_check_complete(f"Update check failed: {exc}"))
+            message = f"Update check failed: {exc}"
+            self.root.after(0, lambda: self._on_update_check_complete(message))
 
     def _on_update_check_complete(self, message: str) -> None:
         self.progress.stop()
@@ -848,6 +1073,8 @@ class App:
 
 
 def fetch_latest_release() -> dict:
+    from urllib.request import Request, urlopen
+
     req = Request(UPDATE_API_URL, headers={"User-Agent": "pdfmaker"})
     with urlopen(req, timeout=6) as response:
         payload = response.read().decode("utf-8")
@@ -878,6 +1105,9 @@ def find_asset(release_info: dict, name: str) -> dict | None:
 
 
 def download_file(url: str) -> str:
+    import tempfile
+    from urllib.request import Request, urlopen
+
     req = Request(url, headers={"User-Agent": "pdfmaker"})
     with urlopen(req, timeout=30) as response:
         data = response.read()
@@ -887,9 +1117,19 @@ def download_file(url: str) -> str:
     return temp_path
 
 
+def read_int(data: dict, key: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(data.get(key, default)))
+    except (TypeError, ValueError):
+        return default
+
+
 def settings_path() -> str:
-    base = os.getenv("APPDATA") or os.path.expanduser("~")
-    return os.path.join(base, "pdfmaker", "settings.json")
+    return os.path.join(data_dir(), "settings.json")
+
+
+def thumbnail_cache_dir() -> str:
+    return os.path.join(data_dir(), "thumbnails")
 
 
 def default_output_dir() -> str:
@@ -898,19 +1138,27 @@ def default_output_dir() -> str:
 
 
 def main() -> None:
+    freeze_support()
     try:
         import ctypes
 
         ctypes.windll.shcore.SetProcessDpiAwareness(1)
     except Exception:
         pass
-    if TkinterDnD:
-        root = TkinterDnD.Tk()
-    else:
-        root = tk.Tk()
+    root = tk.Tk()
     app = App(root)
+    if STARTUP_REPORT_FLAG in sys.argv[1:]:
+        root.after_idle(lambda: report_startup(root))
     root.mainloop()
 
 
+def report_startup(root: tk.Tk) -> None:
+    root.update()
+    json.dump({"first_paint": time.time(), "modules": sorted(sys.modules)}, sys.stdout)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+    root.destroy()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import freeze_support, get_context
+
+import img2pdf
+import PIL
+from PIL import Image
+
+from engine import (
+    DEFAULT_BATCH_WORKERS,
+    DEFAULT_OUTPUT_PROFILE,
+    DEFAULT_VALIDATION_WORKERS,
+    DEFAULT_WORKER_MEMORY_MB,
+    OUTPUT_PROFILES,
+    PAGE_MODES,
+    convert_input,
+    run_batch,
+    scan_images,
+    scan_zip_images,
+    write_images_pdf,
+)
+from metadata import prefetch_info
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+RESULTS_VERSION = 1
+CORPUS_VERSION = 1
+SEED = 20240601
+TILE_SIZE = (48, 36)
+JPEG_QUALITY = 90
+MIXED_KINDS = ("png", "png-alpha", "bmp", "gif", "gif-animated")
+GIF_FRAMES = 8
+
+
+def corpus_spec(scale: float) -> dict:
+    return {
+        "version": CORPUS_VERSION,
+        "seed": SEED,
+        "jpeg": {"count": max(1, round(200 * scale)), "size": [2400, 1800]},
+        "mixed": {"count": max(1, round(100 * scale)), "size": [1200, 900]},
+        "batch": {"folders": max(1, round(100 * scale)), "count": 5, "size": [800, 600]},
+    }
+
+
+def synthetic_image(rng: random.Random, size: tuple[int, int], mode: str = "RGB") -> Image.Image:
+    bands = len(mode)
+    tile = Image.frombytes(mode, TILE_SIZE, rng.randbytes(TILE_SIZE[0] * TILE_SIZE[1] * bands))
+    return tile.resize(size, Image.Resampling.BICUBIC)
+
+
+def write_jpeg_folder(folder: str, rng: random.Random, count: int, size: tuple[int, int]) -> None:
+    os.makedirs(folder, exist_ok=True)
+    for index in range(1, count + 1):
+        image = synthetic_image(rng, size)
+        image.save(os.path.join(folder, f"photo_{index:05d}.jpg"), quality=JPEG_QUALITY, dpi=(300, 300))
+
+
+def write_mixed_folder(folder: str, rng: random.Random, count: int, size: tuple[int, int]) -> None:
+    os.makedirs(folder, exist_ok=True)
+    for index in range(1, count + 1):
+        kind = MIXED_KINDS[(index - 1) % len(MIXED_KINDS)]
+        name = os.path.join(folder, f"image_{index:05d}")
+        if kind == "png":
+            synthetic_image(rng, size).save(f"{name}.png")
+        elif kind == "png-alpha":
+            synthetic_image(rng, size, "RGBA").save(f"{name}.png")
+        elif kind == "bmp":
+            synthetic_image(rng, size).save(f"{name}.bmp")
+        elif kind == "gif":
+            synthetic_image(rng, size).convert("P").save(f"{name}.gif")
+        else:
+            frames = [synthetic_image(rng, size).convert("P") for _ in range(GIF_FRAMES)]
+            frames[0].save(f"{name}.gif", save_all=True, append_images=frames[1:], duration=100)
+
+
+def write_zip(path: str, folder: str) -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive:
+        for name in sorted(os.listdir(folder)):
+            archive.write(os.path.join(folder, name), name)
+
+
+def corpus_stats(path: str) -> dict:
+    if os.path.isfile(path):
+        return {"files": len(scan_zip_images(path)), "bytes": os.path.getsize(path)}
+    files = 0
+    size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return {"files": files, "bytes": size}
+
+
+def build_corpora(corpus_dir: str, scale: float) -> dict:
+    spec = corpus_spec(scale)
+    marker = os.path.join(corpus_dir, "corpus.json")
+    try:
+        with open(marker, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("spec") == spec:
+            return stored["corpora"]
+    except Exception:
+        pass
+
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    rng = random.Random(SEED)
+    jpeg = os.path.join(corpus_dir, "jpeg")
+    write_jpeg_folder(jpeg, rng, spec["jpeg"]["count"], tuple(spec["jpeg"]["size"]))
+    mixed = os.path.join(corpus_dir, "mixed")
+    write_mixed_folder(mixed, rng, spec["mixed"]["count"], tuple(spec["mixed"]["size"]))
+    archive = os.path.join(corpus_dir, "jpeg.zip")
+    write_zip(archive, jpeg)
+    batch = os.path.join(corpus_dir, "batch")
+    for number in range(1, spec["batch"]["folders"] + 1):
+        folder = os.path.join(batch, f"folder_{number:03d}")
+        write_jpeg_folder(folder, rng, spec["batch"]["count"], tuple(spec["batch"]["size"]))
+
+    corpora = {
+        "jpeg": dict(corpus_stats(jpeg), path=jpeg),
+        "mixed": dict(corpus_stats(mixed), path=mixed),
+        "zip": dict(corpus_stats(archive), path=archive),
+        "batch": dict(corpus_stats(batch), path=batch),
+    }
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump({"spec": spec, "corpora": corpora}, f, indent=2)
+    return corpora
+
+
+def mode_slug(page_mode: str) -> str:
+    return page_mode.lower().replace(" ", "-").replace("(", "").replace(")", "")
+
+
+def case_list(corpora: dict) -> list:
+    cases = []
+    for name in ("jpeg", "mixed"):
+        cases.append((f"scan-{name}-cold", "scan", name, {"use_index": False}))
+        cases.append((f"scan-{name}-indexed", "scan", name, {"use_index": True}))
+        cases.append((f"validate-{name}", "validate", name, {}))
+        for page_mode in PAGE_MODES:
+            cases.append((f"write-{name}-{mode_slug(page_mode)}", "write", name, {"page_mode": page_mode}))
+    screen = {"page_mode": PAGE_MODES[0], "profile": OUTPUT_PROFILES[1]}
+    cases.append(("write-jpeg-screen", "write", "jpeg", screen))
+    cases.append(("scan-zip", "scan-zip", "zip", {}))
+    cases.append(("convert-zip", "convert", "zip", {}))
+    cases.append(("batch", "batch", "batch", {}))
+    return cases
+
+
+def run_case(kind: str, corpus: dict, out_dir: str, options: dict) -> dict:
+    path = corpus["path"]
+    os.makedirs(out_dir, exist_ok=True)
+    output = os.path.join(out_dir, "output.pdf")
+    max_bytes = DEFAULT_WORKER_MEMORY_MB * 1024 * 1024
+    pages = None
+    if kind == "scan":
+        if options["use_index"]:
+            scan_images(path)
+        start = time.perf_counter()
+        scan_images(path, use_index=options["use_index"])
+    elif kind == "validate":
+        sources = [record.source for record in scan_images(path, use_index=False)]
+        start = time.perf_counter()
+        prefetch_info(sources, DEFAULT_VALIDATION_WORKERS)
+    elif kind == "write":
+        sources = [record.source for record in scan_images(path, use_index=False)]
+        start = time.perf_counter()
+        pages, _ = write_images_pdf(
+            output,
+            sources,
+            options["page_mode"],
+            DEFAULT_VALIDATION_WORKERS,
+            max_bytes,
+            profile=options.get("profile", DEFAULT_OUTPUT_PROFILE),
+        )
+    elif kind == "scan-zip":
+        start = time.perf_counter()
+        scan_zip_images(path)
+    elif kind == "convert":
+        start = time.perf_counter()
+        pages = convert_input(path, output, workers=DEFAULT_VALIDATION_WORKERS, max_bytes=max_bytes)["pages"]
+    else:
+        folders = sorted(os.path.join(path, name) for name in os.listdir(path))
+        jobs = [(folder, os.path.join(out_dir, f"{os.path.basename(folder)}.pdf")) for folder in folders]
+        start = time.perf_counter()
+        results = run_batch(
+            jobs,
+            processes=DEFAULT_BATCH_WORKERS,
+            workers=DEFAULT_VALIDATION_WORKERS,
+            max_bytes=max_bytes,
+            use_cache=False,
+        )
+        pages = sum(result["pages"] for result in results)
+    seconds = time.perf_counter() - start
+    result = {"seconds": seconds, "peak_rss_mb": peak_rss_mb()}
+    if pages is not None:
+        result["pages"] = pages
+        result["output_bytes"] = sum(
+            os.path.getsize(os.path.join(out_dir, name)) for name in os.listdir(out_dir) if name.endswith(".pdf")
+        )
+    return result
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    unit = 1 if sys.platform == "darwin" else 1024
+    return round(peak * unit / (1024 * 1024), 1)
+
+
+def measure(name: str, kind: str, corpus_name: str, corpus: dict, work_dir: str, options: dict, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        out_dir = os.path.join(work_dir, "out", name)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            runs.append(executor.submit(run_case, kind, corpus, out_dir, options).result())
+        shutil.rmtree(out_dir, ignore_errors=True)
+    best = min(runs, key=lambda run: run["seconds"])
+    seconds = best["seconds"]
+    rss = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None]
+    result = dict(best, corpus=corpus_name, files=corpus["files"], bytes=corpus["bytes"])
+    result["seconds"] = round(seconds, 4)
+    result["runs"] = [round(run["seconds"], 4) for run in runs]
+    result["files_per_sec"] = round(corpus["files"] / seconds, 1) if seconds else None
+    result["mb_per_sec"] = round(corpus["bytes"] / (1024 * 1024) / seconds, 1) if seconds else None
+    result["peak_rss_mb"] = max(rss) if rss else None
+    if "page_mode" in options:
+        result["page_mode"] = options["page_mode"]
+    if "profile" in options:
+        result["profile"] = options["profile"]
+    return result
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pillow": PIL.__version__,
+        "img2pdf": img2pdf.__version__,
+    }
+
+
+def format_change(seconds: float, previous: dict | None) -> str:
+    if not previous or not previous.get("seconds"):
+        return ""
+    change = (seconds - previous["seconds"]) / previous["seconds"] * 100
+    return f"  ({change:+.1f}% vs baseline)"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="benchmark",
+        description="Time the conversion pipeline on generated image sets and save the results as JSON.",
+    )
+    parser.add_argument("--work-dir", default="benchmark-data", help="folder for generated images and outputs")
+    parser.add_argument("-o", "--output", default="benchmark-results.json", help="JSON file for the results")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the number of generated images")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest is reported")
+    parser.add_argument("--case", action="append", default=[], help="run only cases whose name starts with this")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    return parser
+
+
+def main(argv: list | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    work_dir = os.path.abspath(args.work_dir)
+    appdata = os.path.join(work_dir, "appdata")
+    shutil.rmtree(appdata, ignore_errors=True)
+    os.makedirs(appdata, exist_ok=True)
+    os.environ["APPDATA"] = appdata
+
+    print("Preparing image sets...", flush=True)
+    corpora = build_corpora(os.path.join(work_dir, "corpus"), args.scale)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    results = {}
+    for name, kind, corpus_name, options in case_list(corpora):
+        if args.case and not any(name.startswith(prefix) for prefix in args.case):
+            continue
+        result = measure(name, kind, corpus_name, corpora[corpus_name], work_dir, options, max(1, args.repeat))
+        results[name] = result
+        rss = "" if result["peak_rss_mb"] is None else f", peak {result['peak_rss_mb']} MB"
+        print(
+            f"{name}: {result['seconds']:.3f}s, {result['files_per_sec']} files/s, "
+            f"{result['mb_per_sec']} MB/s{rss}{format_change(result['seconds'], baseline.get(name))}",
+            flush=True,
+        )
+
+    data = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scale": args.scale,
+        "environment": environment(),
+        "corpora": {name: {key: corpus[key] for key in ("files", "bytes")} for name, corpus in corpora.items()},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import freeze_support
+
+from engine import (
+    DEFAULT_BATCH_WORKERS,
+    DEFAULT_RESAMPLE_PROCESSES,
+    DEFAULT_VALIDATION_WORKERS,
+    DEFAULT_WORKER_MEMORY_MB,
+    convert_input,
+    ensure_pdf_extension,
+    is_zip_file,
+    output_path_for_input,
+    run_batch,
+    run_log_dir,
+)
+from runlog import append_run, run_record
+from watch import FolderWatcher
+
+
+PAGE_MODE_FLAGS = {
+    "fit": "A4 (fit)",
+    "no-upscale": "A4 (no upscale)",
+    "original": "Original size",
+}
+PROFILE_FLAGS = {
+    "archive": "Archive",
+    "screen": "Screen (150 dpi)",
+    "ebook": "eBook (200 dpi)",
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pdfmaker",
+        description="Merge the images in folders or zip files into PDFs.",
+    )
+    parser.add_argument("inputs", nargs="+", help="folders or zip files; several inputs run as a batch")
+    parser.add_argument("-o", "--output", help="output PDF path (single input only)")
+    parser.add_argument("--output-dir", default="", help="folder for generated PDFs (default: next to each input)")
+    parser.add_argument("--page-mode", choices=list(PAGE_MODE_FLAGS), default="fit", help="page size mode")
+    parser.add_argument(
+        "--profile",
+        choices=list(PROFILE_FLAGS),
+        default="archive",
+        help="archive keeps images as they are; screen/ebook downsample to 150/200 dpi JPEG",
+    )
+    parser.add_argument("--threads", type=int, default=DEFAULT_VALIDATION_WORKERS, help="image reader threads per PDF")
+    parser.add_argument("--processes", type=int, default=DEFAULT_BATCH_WORKERS, help="parallel PDFs in batch mode")
+    parser.add_argument(
+        "--resample-processes",
+        type=int,
+        default=DEFAULT_RESAMPLE_PROCESSES,
+        help="processes that downsample images for a single input",
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=int,
+        default=DEFAULT_WORKER_MEMORY_MB,
+        help="image bytes each PDF may buffer ahead of the writer",
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="add only images that are new since the last --append build to the existing PDF",
+    )
+    parser.add_argument("--max-pages", type=int, default=0, help="split output into volumes of at most this many pages")
+    parser.add_argument(
+        "--max-mb",
+        type=int,
+        default=0,
+        help="split output into volumes of about this many MB of source images",
+    )
+    parser.add_argument("--force", action="store_true", help="rebuild batch PDFs even if their inputs are unchanged")
+    parser.add_argument(
+        "--hash",
+        action="store_true",
+        help="compare file contents, not just sizes and times, when checking whether a batch PDF is up to date",
+    )
+    parser.add_argument(
+        "--capture",
+        action="store_true",
+        help="save cProfile and tracemalloc reports for each input under the settings folder (slower)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild each folder's PDF when images are added or changed (Ctrl+C stops)",
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    return parser
+
+
+def run(args: argparse.Namespace) -> list:
+    page_mode = PAGE_MODE_FLAGS[args.page_mode]
+    profile = PROFILE_FLAGS[args.profile]
+    max_bytes = max(1, args.memory_mb) * 1024 * 1024
+    jobs = []
+    for input_path in args.inputs:
+        input_path = os.path.normpath(input_path)
+        output = args.output or output_path_for_input(input_path, args.output_dir)
+        jobs.append((input_path, ensure_pdf_extension(output)))
+
+    if len(jobs) == 1:
+        input_path, output = jobs[0]
+        return [
+            convert_input(
+                input_path,
+                output,
+                page_mode,
+                max(1, args.threads),
+                max_bytes,
+                profile=profile,
+                processes=max(1, args.resample_processes),
+                append=args.append,
+                volume_pages=max(0, args.max_pages),
+                volume_mb=max(0, args.max_mb),
+                capture=args.capture,
+            )
+        ]
+    return run_batch(
+        jobs,
+        page_mode,
+        processes=max(1, args.processes),
+        workers=max(1, args.threads),
+        max_bytes=max_bytes,
+        profile=profile,
+        use_cache=not args.force,
+        hash_contents=args.hash,
+        append=args.append,
+        volume_pages=max(0, args.max_pages),
+        volume_mb=max(0, args.max_mb),
+        capture=args.capture,
+    )
+
+
+def watch(args: argparse.Namespace) -> int:
+    jobs = []
+    for folder in args.inputs:
+        folder = os.path.normpath(folder)
+        jobs.append((folder, ensure_pdf_extension(output_path_for_input(folder, args.output_dir))))
+    options = {
+        "page_mode": PAGE_MODE_FLAGS[args.page_mode],
+        "workers": max(1, args.threads),
+        "max_bytes": max(1, args.memory_mb) * 1024 * 1024,
+        "profile": PROFILE_FLAGS[args.profile],
+        "hash_contents": args.hash,
+        "append": args.append,
+        "volume_pages": max(0, args.max_pages),
+        "volume_mb": max(0, args.max_mb),
+        "capture": args.capture,
+    }
+    watcher = FolderWatcher(jobs, options, processes=max(1, args.processes), on_result=print_result)
+    print(f"Watching {len(jobs)} folder(s). Press Ctrl+C to stop.", flush=True)
+    watcher.start()
+    try:
+        while watcher.thread.is_alive():
+            watcher.thread.join(1.0)
+    except KeyboardInterrupt:
+        print("Stopping...", flush=True)
+        watcher.stop()
+    return 0
+
+
+def print_result(result: dict) -> None:
+    outputs = ", ".join(result.get("outputs") or [result["output"]])
+    print(f"{result['input']}: {result['status']} -> {outputs}", flush=True)
+
+
+def main(argv: list | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.output and len(args.inputs) > 1:
+        parser.error("--output can only be used with a single input")
+    if args.watch:
+        if args.output:
+            parser.error("--output cannot be used with --watch; use --output-dir")
+        for input_path in args.inputs:
+            if not os.path.isdir(input_path):
+                parser.error(f"--watch needs folders: {input_path}")
+        return watch(args)
+    for input_path in args.inputs:
+        if not os.path.isdir(input_path) and not is_zip_file(input_path):
+            parser.error(f"not a folder or zip file: {input_path}")
+
+    start = time.perf_counter()
+    results = run(args)
+    settings = {
+        "page_mode": PAGE_MODE_FLAGS[args.page_mode],
+        "profile": PROFILE_FLAGS[args.profile],
+        "threads": args.threads,
+        "processes": args.processes,
+        "append": args.append,
+        "max_pages": args.max_pages,
+        "max_mb": args.max_mb,
+    }
+    kind = "batch" if len(results) > 1 else "single"
+    append_run(run_log_dir(), run_record(kind, results, time.perf_counter() - start, settings))
+    if args.json:
+        json.dump({"results": results}, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+    else:
+        for result in results:
+            print_result(result)
+    return 0 if all(result["pages"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
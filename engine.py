@@ -0,0 +1,502 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+from folderindex import scan_folder
+from manifest import (
+    build_manifest,
+    built_prefix,
+    is_up_to_date,
+    load_manifest,
+    load_sidecar,
+    save_manifest,
+    save_sidecar,
+    source_entry,
+)
+from progress import JobCancelled, ProgressChannel
+from runlog import capture_run
+from sources import (
+    MULTI_FRAME_EXTENSIONS,
+    ImageRecord,
+    close_zip_handles,
+    expand_frames,
+    frame_count,
+    list_zip_entries,
+    source_size,
+)
+
+
+SUPPORTED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff"}
+MM_PER_INCH = 25.4
+A4_SIZE_PT = (72.0 * 210 / MM_PER_INCH, 72.0 * 297 / MM_PER_INCH)
+PAGE_MODES = ["A4 (fit)", "A4 (no upscale)", "Original size"]
+DEFAULT_PAGE_MODE = PAGE_MODES[0]
+OUTPUT_PROFILES = ["Archive", "Screen (150 dpi)", "eBook (200 dpi)"]
+DEFAULT_OUTPUT_PROFILE = OUTPUT_PROFILES[0]
+PROFILE_DOWNSAMPLE = {
+    "Screen (150 dpi)": (150, 70),
+    "eBook (200 dpi)": (200, 85),
+}
+FULLWIDTH_TO_ASCII = str.maketrans("０１２３４５６７８９", "0123456789")
+DIGITS_RE = re.compile(r"(\d+)")
+SORT_KEY_CACHE_SIZE = 1 << 17
+DEFAULT_VALIDATION_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+DEFAULT_BATCH_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_WORKER_MEMORY_MB = 512
+DEFAULT_RESAMPLE_PROCESSES = os.cpu_count() or 1
+
+_worker_cancel_event = None
+
+
+@lru_cache(maxsize=SORT_KEY_CACHE_SIZE)
+def natural_sort_key(value: str) -> tuple:
+    parts = DIGITS_RE.split(value.translate(FULLWIDTH_TO_ASCII).lower())
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+def is_zip_file(path: str) -> bool:
+    return os.path.isfile(path) and path.lower().endswith(".zip")
+
+
+def data_dir() -> str:
+    base = os.getenv("APPDATA") or os.path.expanduser("~")
+    return os.path.join(base, "pdfmaker")
+
+
+def folder_index_dir() -> str:
+    return os.path.join(data_dir(), "index")
+
+
+def manifest_dir() -> str:
+    return os.path.join(data_dir(), "manifests")
+
+
+def run_log_dir() -> str:
+    return os.path.join(data_dir(), "logs")
+
+
+def capture_dir() -> str:
+    return os.path.join(run_log_dir(), "profiles")
+
+
+def scan_images(folder: str, use_index: bool = True) -> list:
+    index_dir = folder_index_dir() if use_index else None
+    entries = scan_folder(
+        folder, SUPPORTED_EXTENSIONS, natural_sort_key, index_dir, frame_count, MULTI_FRAME_EXTENSIONS
+    )
+    records = []
+    for name, _, _, _, frames in entries:
+        records.extend(frame_records(os.path.join(folder, name), name, frames))
+    return records
+
+
+def scan_zip_images(path: str) -> list:
+    entries = list_zip_entries(path, SUPPORTED_EXTENSIONS)
+    entries.sort(key=lambda entry: natural_sort_key(entry.name))
+    records = []
+    try:
+        for entry in entries:
+            records.extend(frame_records(entry, entry.name, frame_count(entry)))
+    finally:
+        close_zip_handles()
+    return records
+
+
+def frame_records(source, name: str, frames: int) -> list:
+    if frames <= 1:
+        return [ImageRecord(source, name)]
+    return [
+        ImageRecord(frame, f"{name} [{frame.frame + 1}/{frames}]")
+        for frame in expand_frames(source, frames)
+    ]
+
+
+def layout_fun_for_mode(mode: str):
+    import img2pdf
+
+    if mode == "A4 (no upscale)":
+        return img2pdf.get_layout_fun(A4_SIZE_PT, fit=img2pdf.FitMode.shrink)
+    if mode == "Original size":
+        return img2pdf.get_layout_fun()
+    return img2pdf.get_layout_fun(A4_SIZE_PT, fit=img2pdf.FitMode.into)
+
+
+def input_base_name(path: str) -> str:
+    base = os.path.basename(os.path.normpath(path)) or "output"
+    if is_zip_file(path):
+        base = os.path.splitext(base)[0] or "output"
+    return base
+
+
+def input_output_dir(path: str) -> str:
+    if is_zip_file(path):
+        return os.path.dirname(path)
+    return path
+
+
+def output_path_for_input(input_path: str, output_dir: str = "") -> str:
+    base = input_base_name(input_path)
+    return os.path.join(output_dir or input_output_dir(input_path), f"{base}.pdf")
+
+
+def ensure_pdf_extension(output: str) -> str:
+    return output if output.lower().endswith(".pdf") else output + ".pdf"
+
+
+def ensure_output_dir(output: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    except Exception:
+        pass
+
+
+def write_images_pdf(
+    output: str,
+    images: list,
+    page_mode: str = DEFAULT_PAGE_MODE,
+    workers: int = DEFAULT_VALIDATION_WORKERS,
+    max_bytes: int | None = None,
+    progress: ProgressChannel | None = None,
+    profile: str = DEFAULT_OUTPUT_PROFILE,
+    processes: int = DEFAULT_RESAMPLE_PROCESSES,
+    append: bool = False,
+) -> tuple[int, list]:
+    from pdfstream import build_pdf
+
+    if append:
+        return append_images_pdf(output, images, page_mode, workers, max_bytes, progress, profile, processes)
+    return build_pdf(
+        output,
+        images,
+        layout_fun_for_mode(page_mode),
+        workers=workers,
+        max_bytes=max_bytes,
+        progress=progress,
+        downsample=PROFILE_DOWNSAMPLE.get(profile),
+        processes=processes,
+    )
+
+
+def append_images_pdf(
+    output: str,
+    images: list,
+    page_mode: str = DEFAULT_PAGE_MODE,
+    workers: int = DEFAULT_VALIDATION_WORKERS,
+    max_bytes: int | None = None,
+    progress: ProgressChannel | None = None,
+    profile: str = DEFAULT_OUTPUT_PROFILE,
+    processes: int = DEFAULT_RESAMPLE_PROCESSES,
+) -> tuple[int, list]:
+    from pdfstream import build_pdf
+
+    settings = {"page_mode": page_mode, "profile": profile}
+    files = [source_entry(source) for source in images]
+    stored = load_sidecar(output)
+    built = built_prefix(stored, settings, files, output)
+    state = dict(stored["pdf"]) if built else {}
+    _, warnings = build_pdf(
+        output,
+        images[built:],
+        layout_fun_for_mode(page_mode),
+        workers=workers,
+        max_bytes=max_bytes,
+        progress=progress,
+        downsample=PROFILE_DOWNSAMPLE.get(profile),
+        processes=processes,
+        state=state,
+    )
+    if state:
+        save_sidecar(output, settings, files, state)
+    return len(state.get("page_ids", [])), warnings
+
+
+def split_volumes(images: list, volume_pages: int = 0, volume_mb: int = 0) -> list:
+    limit = volume_mb * 1024 * 1024
+    volumes = []
+    current = []
+    current_bytes = 0
+    for source in images:
+        size = source_size(source)
+        if current and (
+            (volume_pages and len(current) >= volume_pages) or (limit and current_bytes + size > limit)
+        ):
+            volumes.append(current)
+            current = []
+            current_bytes = 0
+        current.append(source)
+        current_bytes += size
+    if current:
+        volumes.append(current)
+    return volumes
+
+
+def volume_path(output: str, number: int) -> str:
+    root, ext = os.path.splitext(output)
+    return f"{root}_{number:03d}{ext}"
+
+
+def remove_stale_volumes(output: str, number: int) -> None:
+    while os.path.isfile(volume_path(output, number)):
+        try:
+            os.remove(volume_path(output, number))
+        except OSError:
+            return
+        number += 1
+
+
+def write_volumes(
+    output: str,
+    images: list,
+    page_mode: str = DEFAULT_PAGE_MODE,
+    workers: int = DEFAULT_VALIDATION_WORKERS,
+    max_bytes: int | None = None,
+    progress: ProgressChannel | None = None,
+    profile: str = DEFAULT_OUTPUT_PROFILE,
+    processes: int = DEFAULT_RESAMPLE_PROCESSES,
+    volume_pages: int = 0,
+    volume_mb: int = 0,
+) -> tuple[list, int, list]:
+    progress = progress or ProgressChannel()
+    volumes = split_volumes(images, volume_pages, volume_mb)
+    paths = [volume_path(output, number) for number in range(1, len(volumes) + 1)]
+    results = [None] * len(volumes)
+    if processes <= 1 or len(volumes) == 1:
+        for index, (path, volume) in enumerate(zip(paths, volumes)):
+            results[index] = write_images_pdf(
+                path, volume, page_mode, workers, max_bytes, progress, profile, processes
+            )
+    else:
+        progress.update(0, len(volumes), f"Writing {len(volumes)} volumes")
+        with ProcessPoolExecutor(
+            max_workers=min(processes, len(volumes)),
+            initializer=init_worker,
+            initargs=(progress.cancel_event,),
+        ) as executor:
+            futures = {
+                executor.submit(_write_volume, path, volume, page_mode, workers, max_bytes, profile): index
+                for index, (path, volume) in enumerate(zip(paths, volumes))
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                pages, warnings, report = future.result()
+                results[futures[future]] = (pages, warnings)
+                progress.merge_report(report)
+                progress.update(done, len(volumes), f"Wrote volume {done}/{len(volumes)}")
+    remove_stale_volumes(output, len(volumes) + 1)
+    outputs = [path for path, (pages, _) in zip(paths, results) if pages]
+    pages = sum(pages for pages, _ in results)
+    warnings = [name for _, volume_warnings in results for name in volume_warnings]
+    return outputs, pages, warnings
+
+
+def _write_volume(
+    output: str,
+    images: list,
+    page_mode: str,
+    workers: int,
+    max_bytes: int | None,
+    profile: str,
+) -> tuple[int, list, dict]:
+    progress = ProgressChannel(_worker_cancel_event)
+    pages, warnings = write_images_pdf(output, images, page_mode, workers, max_bytes, progress, profile, 1)
+    return pages, warnings, progress.report()
+
+
+def init_worker(cancel_event) -> None:
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def convert_input(
+    input_path: str,
+    output: str,
+    page_mode: str = DEFAULT_PAGE_MODE,
+    workers: int = DEFAULT_VALIDATION_WORKERS,
+    max_bytes: int | None = None,
+    progress: ProgressChannel | None = None,
+    profile: str = DEFAULT_OUTPUT_PROFILE,
+    processes: int = DEFAULT_RESAMPLE_PROCESSES,
+    use_cache: bool = False,
+    hash_contents: bool = False,
+    append: bool = False,
+    volume_pages: int = 0,
+    volume_mb: int = 0,
+    capture: bool = False,
+) -> dict:
+    progress = progress or ProgressChannel(_worker_cancel_event)
+    result = {"input": input_path, "output": output, "status": "", "pages": 0, "warnings": []}
+    try:
+        with capture_run(capture_dir() if capture else None, input_base_name(input_path)) as captures:
+            _convert_input(
+                result,
+                page_mode,
+                workers,
+                max_bytes,
+                progress,
+                profile,
+                processes,
+                use_cache,
+                hash_contents,
+                append,
+                volume_pages,
+                volume_mb,
+            )
+    finally:
+        close_zip_handles()
+        result.update(progress.report())
+    if captures:
+        result["captures"] = captures
+    return result
+
+
+def _convert_input(
+    result: dict,
+    page_mode: str,
+    workers: int,
+    max_bytes: int | None,
+    progress: ProgressChannel,
+    profile: str,
+    processes: int,
+    use_cache: bool,
+    hash_contents: bool,
+    append: bool,
+    volume_pages: int,
+    volume_mb: int,
+) -> None:
+    input_path = result["input"]
+    output = result["output"]
+    if progress.cancelled:
+        result["status"] = "Cancelled"
+        return
+    with progress.stage("scan"):
+        if is_zip_file(input_path):
+            try:
+                records = scan_zip_images(input_path)
+            except Exception as exc:
+                result["status"] = f"Failed to read zip file: {exc}"
+                return
+        else:
+            try:
+                records = scan_images(input_path)
+            except OSError as exc:
+                result["status"] = f"Failed to read folder: {exc}"
+                return
+    if not records:
+        result["status"] = "No supported images found."
+        return
+    images = [record.source for record in records]
+    manifest = None
+    if use_cache:
+        settings = {
+            "page_mode": page_mode,
+            "profile": profile,
+            "volume_pages": volume_pages,
+            "volume_mb": volume_mb,
+        }
+        with progress.stage("scan"):
+            try:
+                manifest = build_manifest(input_path, settings, images, hash_contents)
+            except OSError:
+                manifest = None
+        if manifest is not None:
+            stored = load_manifest(manifest_dir(), output)
+            if is_up_to_date(stored, manifest):
+                result["outputs"] = list(stored["outputs"])
+                result["pages"] = stored["pages"]
+                result["warnings"] = stored["warnings"]
+                result["status"] = "Up to date"
+                result["up_to_date"] = True
+                return
+    ensure_output_dir(output)
+    try:
+        if volume_pages or volume_mb:
+            result["outputs"], pages, warnings = write_volumes(
+                output, images, page_mode, workers, max_bytes, progress, profile, processes, volume_pages, volume_mb
+            )
+        else:
+            pages, warnings = write_images_pdf(
+                output, images, page_mode, workers, max_bytes, progress, profile, processes, append
+            )
+    except JobCancelled:
+        result["status"] = "Cancelled"
+        return
+    except Exception as exc:
+        result["status"] = "Failed to write PDF."
+        result["error"] = str(exc)
+        return
+    result["pages"] = pages
+    result["warnings"] = warnings
+    if not pages:
+        result["status"] = "No valid images found."
+    elif warnings:
+        result["status"] = f"Skipped {len(warnings)} unreadable file(s)."
+    else:
+        result["status"] = "OK"
+    if manifest is not None and pages:
+        save_manifest(manifest_dir(), output, manifest, result)
+
+
+def run_batch(
+    jobs: list,
+    page_mode: str = DEFAULT_PAGE_MODE,
+    processes: int = DEFAULT_BATCH_WORKERS,
+    workers: int = DEFAULT_VALIDATION_WORKERS,
+    max_bytes: int | None = None,
+    progress: ProgressChannel | None = None,
+    profile: str = DEFAULT_OUTPUT_PROFILE,
+    use_cache: bool = True,
+    hash_contents: bool = False,
+    append: bool = False,
+    volume_pages: int = 0,
+    volume_mb: int = 0,
+    capture: bool = False,
+) -> list:
+    progress = progress or ProgressChannel()
+    total = len(jobs)
+    results = [None] * total
+    if not total:
+        return results
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(processes, total)),
+        initializer=init_worker,
+        initargs=(progress.cancel_event,),
+    ) as executor:
+        futures = {
+            executor.submit(
+                convert_input,
+                input_path,
+                output,
+                page_mode,
+                workers,
+                max_bytes,
+                profile=profile,
+                processes=1,
+                use_cache=use_cache,
+                hash_contents=hash_contents,
+                append=append,
+                volume_pages=volume_pages,
+                volume_mb=volume_mb,
+                capture=capture,
+            ): index
+            for index, (input_path, output) in enumerate(jobs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            input_path, output = jobs[index]
+            try:
+                results[index] = future.result()
+            except Exception as exc:
+                results[index] = {
+                    "input": input_path,
+                    "output": output,
+                    "status": "Cancelled" if progress.cancelled else f"Failed: {exc}",
+                    "pages": 0,
+                    "warnings": [],
+                    "stage_times": {},
+                    "bytes": {},
+                    "slowest": [],
+                }
+            progress.merge_report(results[index])
+            progress.update(done, total, f"Processed {done}/{total}: {os.path.basename(input_path)}")
+    return results
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import time
+
+
+INDEX_VERSION = 2
+MTIME_SLACK_NS = 2_000_000_000
+
+
+def index_file(index_dir: str, folder: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(folder).encode("utf-8", "surrogatepass")).hexdigest()
+    return os.path.join(index_dir, f"{digest}.json")
+
+
+def load_index(index_dir: str, folder: str) -> dict | None:
+    try:
+        with open(index_file(index_dir, folder), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if data.get("version") != INDEX_VERSION or data.get("folder") != os.path.abspath(folder):
+        return None
+    return data
+
+
+def save_index(index_dir: str, folder: str, data: dict) -> None:
+    path = index_file(index_dir, folder)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def refresh_entry(entry: list, stat: os.stat_result, path: str, frame_count) -> list:
+    if entry[1] == stat.st_size and entry[2] == stat.st_mtime_ns:
+        return entry
+    frames = frame_count(path) if frame_count else 1
+    return [entry[0], stat.st_size, stat.st_mtime_ns, entry[3], frames]
+
+
+def scan_folder(
+    folder: str,
+    extensions: set,
+    sort_key,
+    index_dir: str | None = None,
+    frame_count=None,
+    recheck_extensions: set = frozenset(),
+) -> list:
+    folder_mtime = os.stat(folder).st_mtime_ns
+    index = load_index(index_dir, folder) if index_dir else None
+    if (
+        index is not None
+        and index["mtime_ns"] == folder_mtime
+        and folder_mtime < index["scanned_ns"] - MTIME_SLACK_NS
+    ):
+        entries = index["entries"]
+        if not recheck_extensions:
+            return entries
+        changed = False
+        for position, entry in enumerate(entries):
+            if os.path.splitext(entry[0])[1].lower() not in recheck_extensions:
+                continue
+            path = os.path.join(folder, entry[0])
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            refreshed = refresh_entry(entry, stat, path, frame_count)
+            if refreshed is not entry:
+                entries[position] = refreshed
+                changed = True
+        if changed:
+            index["scanned_ns"] = time.time_ns()
+            save_index(index_dir, folder, index)
+        return entries
+
+    known = {}
+    if index is not None:
+        for name, size, mtime_ns, key, frames in index["entries"]:
+            known[name] = [name, size, mtime_ns, tuple(key), frames]
+    scanned_ns = time.time_ns()
+    entries = []
+    with os.scandir(folder) as it:
+        for item in it:
+            extension = os.path.splitext(item.name)[1].lower()
+            if extension not in extensions:
+                continue
+            entry = known.get(item.name)
+            if entry is not None and extension not in recheck_extensions:
+                entries.append(entry)
+                continue
+            try:
+                if not item.is_file():
+                    continue
+                stat = item.stat()
+            except OSError:
+                continue
+            if entry is None:
+                frames = frame_count(item.path) if frame_count else 1
+                entry = [item.name, stat.st_size, stat.st_mtime_ns, sort_key(item.name), frames]
+            else:
+                entry = refresh_entry(entry, stat, item.path, frame_count)
+            entries.append(entry)
+    entries.sort(key=lambda entry: entry[3])
+
+    if index_dir:
+        data = {
+            "version": INDEX_VERSION,
+            "folder": os.path.abspath(folder),
+            "mtime_ns": folder_mtime,
+            "scanned_ns": scanned_ns,
+            "entries": entries,
+        }
+        save_index(index_dir, folder, data)
+    return entries
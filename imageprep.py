@@ -0,0 +1,176 @@
+import struct
+from io import BytesIO
+
+from PIL import Image, ImageOps, TiffImagePlugin
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+BMP_SIGNATURE = b"BM"
+FAST_ZLIB_LEVEL = 1
+ALPHA_MODES = ("RGBA", "LA", "PA", "La", "RGBa")
+PNG_MODES = ("RGB", "L", "P", "1", "I", "I;16")
+BACKGROUND = "white"
+GRAY_MODES = ("1", "L", "LA", "La", "I", "I;16")
+REDUCING_GAP = 3.0
+UPRIGHT_JPEG_QUALITY = 95
+TIFF_SHORT = 3
+TIFF_LONG = 4
+TIFF_RATIONAL = 5
+
+
+def has_alpha(img: Image.Image) -> bool:
+    return img.mode in ALPHA_MODES or "transparency" in img.info
+
+
+def flatten_alpha(img: Image.Image) -> Image.Image:
+    grayscale = img.mode in GRAY_MODES
+    rgba = img.convert("RGBA")
+    background = Image.new("RGB", img.size, BACKGROUND)
+    background.paste(rgba, mask=rgba.getchannel("A"))
+    return background.convert("L") if grayscale else background
+
+
+def png_passthrough(data: bytes, img: Image.Image) -> bool:
+    interlaced = data[28] != 0
+    palette_with_profile = img.mode == "P" and "icc_profile" in img.info
+    return not interlaced and not has_alpha(img) and not palette_with_profile
+
+
+def encode_png(img: Image.Image, info: dict) -> bytes:
+    options = {"compress_level": FAST_ZLIB_LEVEL}
+    if "dpi" in info:
+        options["dpi"] = info["dpi"]
+    if "icc_profile" in info and img.mode != "P":
+        options["icc_profile"] = info["icc_profile"]
+    if "exif" in info:
+        options["exif"] = info["exif"]
+    buffer = BytesIO()
+    img.save(buffer, format="PNG", **options)
+    return buffer.getvalue()
+
+
+def prepare_image(data: bytes) -> bytes:
+    is_png = data.startswith(PNG_SIGNATURE)
+    if not is_png and not data.startswith(BMP_SIGNATURE):
+        return data
+    with Image.open(BytesIO(data)) as img:
+        if is_png and png_passthrough(data, img):
+            return data
+        img.load()
+        return encode_png(normalize_image(img), img.info)
+
+
+def upright_image(data: bytes) -> bytes:
+    with Image.open(BytesIO(data)) as img:
+        is_jpeg = img.format == "JPEG"
+        upright = ImageOps.exif_transpose(img)
+        info = dict(upright.info)
+    if not is_jpeg:
+        info.pop("exif", None)
+        return encode_png(normalize_image(upright), info)
+    options = {"quality": UPRIGHT_JPEG_QUALITY}
+    for key in ("dpi", "icc_profile", "exif"):
+        if key in info:
+            options[key] = info[key]
+    buffer = BytesIO()
+    upright.save(buffer, format="JPEG", **options)
+    return buffer.getvalue()
+
+
+def normalize_image(img: Image.Image) -> Image.Image:
+    if has_alpha(img):
+        return flatten_alpha(img)
+    if img.mode in PNG_MODES:
+        return img
+    return img.convert("RGB")
+
+
+def is_group4_strip(img: Image.Image) -> bool:
+    if img.format != "TIFF" or img.info.get("compression") != "group4":
+        return False
+    offsets = img.tag_v2.get(TiffImagePlugin.STRIPOFFSETS, ())
+    counts = img.tag_v2.get(TiffImagePlugin.STRIPBYTECOUNTS, ())
+    return len(offsets) == 1 and len(counts) == 1
+
+
+def group4_tiff(img: Image.Image) -> bytes:
+    img.fp.seek(img.tag_v2[TiffImagePlugin.STRIPOFFSETS][0])
+    payload = img.fp.read(img.tag_v2[TiffImagePlugin.STRIPBYTECOUNTS][0])
+    xdpi, ydpi = pixel_density(img)
+    tags = [
+        (256, TIFF_LONG, img.width),
+        (257, TIFF_LONG, img.height),
+        (258, TIFF_SHORT, 1),
+        (259, TIFF_SHORT, 4),
+        (262, TIFF_SHORT, img.tag_v2.get(TiffImagePlugin.PHOTOMETRIC_INTERPRETATION, 0)),
+        (266, TIFF_SHORT, img.tag_v2.get(TiffImagePlugin.FILLORDER, 1)),
+        (273, TIFF_LONG, 0),
+        (277, TIFF_SHORT, 1),
+        (278, TIFF_LONG, img.height),
+        (279, TIFF_LONG, len(payload)),
+        (282, TIFF_RATIONAL, 0),
+        (283, TIFF_RATIONAL, 0),
+        (296, TIFF_SHORT, 2),
+    ]
+    ifd_size = 2 + 12 * len(tags) + 4
+    rationals_offset = 8 + ifd_size
+    payload_offset = rationals_offset + 16
+    values = {273: payload_offset, 282: rationals_offset, 283: rationals_offset + 8}
+    entries = [struct.pack("<H", len(tags))]
+    for tag, kind, value in tags:
+        value = values.get(tag, value)
+        packed = struct.pack("<H", value) + b"\0\0" if kind == TIFF_SHORT else struct.pack("<I", value)
+        entries.append(struct.pack("<HHI", tag, kind, 1) + packed)
+    entries.append(struct.pack("<I", 0))
+    rationals = struct.pack("<IIII", round(xdpi), 1, round(ydpi), 1)
+    return b"II*\0" + struct.pack("<I", 8) + b"".join(entries) + rationals + payload
+
+
+def frame_data(img: Image.Image, frame: int) -> bytes:
+    img.seek(frame)
+    if is_group4_strip(img):
+        return group4_tiff(img)
+    img.load()
+    if img.mode == "1":
+        return encode_bilevel_tiff(img)
+    return encode_png(normalize_image(img), dict(img.info, dpi=pixel_density(img)))
+
+
+def encode_bilevel_tiff(img: Image.Image) -> bytes:
+    buffer = BytesIO()
+    img.save(
+        buffer,
+        format="TIFF",
+        compression="group4",
+        dpi=pixel_density(img),
+        tiffinfo={TiffImagePlugin.ROWSPERSTRIP: img.height},
+    )
+    return buffer.getvalue()
+
+
+def pixel_density(img: Image.Image) -> tuple:
+    import img2pdf
+
+    dpi = img.info.get("dpi")
+    if dpi and img.format == "TIFF" and (round(dpi[0]), round(dpi[1])) == (1, 1):
+        dpi = (
+            img.tag_v2.get(TiffImagePlugin.X_RESOLUTION, img2pdf.default_dpi),
+            img.tag_v2.get(TiffImagePlugin.Y_RESOLUTION, img2pdf.default_dpi),
+        )
+    if not dpi or not dpi[0] or not dpi[1]:
+        return (img2pdf.default_dpi, img2pdf.default_dpi)
+    return (round(dpi[0]), round(dpi[1]))
+
+
+def downsample_image(data: bytes, size: tuple[int, int], dpi: int, quality: int) -> bytes:
+    with Image.open(BytesIO(data)) as img:
+        img.draft(img.mode, (max(size), max(size)))
+        grayscale = img.mode in GRAY_MODES
+        upright = ImageOps.exif_transpose(img)
+        if has_alpha(upright):
+            upright = flatten_alpha(upright)
+        upright = upright.convert("L" if grayscale else "RGB")
+        resized = upright.resize(size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+    buffer = BytesIO()
+    resized.save(buffer, format="JPEG", quality=quality, dpi=(dpi, dpi))
+    return buffer.getvalue()
@@ -0,0 +1,68 @@
+import threading
+from collections import deque
+from typing import Callable, NamedTuple
+
+from progress import ProgressChannel
+
+
+class Job(NamedTuple):
+    name: str
+    target: Callable[[ProgressChannel], None]
+    channel: ProgressChannel
+
+
+class JobQueue:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.current = None
+        self.idle = threading.Event()
+        self.idle.set()
+
+    def submit(self, name: str, target: Callable[[ProgressChannel], None]) -> Job:
+        job = Job(name, target, ProgressChannel())
+        with self.lock:
+            self.pending.append(job)
+            if self.current is None:
+                self._start_next()
+        return job
+
+    @property
+    def busy(self) -> bool:
+        with self.lock:
+            return self.current is not None
+
+    def queued(self) -> int:
+        with self.lock:
+            return len(self.pending)
+
+    def cancel_current(self) -> None:
+        with self.lock:
+            if self.current is not None:
+                self.current.channel.cancel()
+
+    def cancel_all(self) -> None:
+        with self.lock:
+            self.pending.clear()
+            if self.current is not None:
+                self.current.channel.cancel()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self.idle.wait(timeout)
+
+    def _start_next(self) -> None:
+        if not self.pending:
+            self.current = None
+            self.idle.set()
+            return
+        self.current = self.pending.popleft()
+        self.idle.clear()
+        thread = threading.Thread(target=self._run, args=(self.current,), daemon=True)
+        thread.start()
+
+    def _run(self, job: Job) -> None:
+        try:
+            job.target(job.channel)
+        finally:
+            with self.lock:
+                self._start_next()
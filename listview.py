@@ -0,0 +1,192 @@
+import tkinter as tk
+from tkinter import font as tkfont, ttk
+
+
+ROW_PADDING = 4
+TEXT_INDENT = 4
+SELECT_BACKGROUND = "#0078d7"
+SELECT_FOREGROUND = "#ffffff"
+TEXT_FOREGROUND = "#000000"
+
+
+class VirtualList(ttk.Frame):
+    def __init__(self, parent, height: int = 12) -> None:
+        super().__init__(parent)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.items = []
+        self.label = str
+        self.top = 0
+        self.selected = set()
+        self.anchor = None
+        self.active = None
+        self.rows = []
+
+        self.font = tkfont.nametofont("TkDefaultFont")
+        self.row_height = self.font.metrics("linespace") + ROW_PADDING
+        self.canvas = tk.Canvas(
+            self,
+            height=self.row_height * height,
+            background="white",
+            highlightthickness=1,
+            takefocus=True,
+        )
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Shift-Button-1>", self._on_shift_click)
+        self.canvas.bind("<Control-Button-1>", self._on_control_click)
+        self.canvas.bind("<Up>", lambda event: self._on_arrow(-1, False))
+        self.canvas.bind("<Down>", lambda event: self._on_arrow(1, False))
+        self.canvas.bind("<Shift-Up>", lambda event: self._on_arrow(-1, True))
+        self.canvas.bind("<Shift-Down>", lambda event: self._on_arrow(1, True))
+        self.canvas.bind("<Prior>", lambda event: self.yview("scroll", -1, "pages"))
+        self.canvas.bind("<Next>", lambda event: self.yview("scroll", 1, "pages"))
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda event: self.yview("scroll", -3, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.yview("scroll", 3, "units"))
+
+    def set_items(self, items: list, label=str) -> None:
+        self.items = items
+        self.label = label
+        self.top = 0
+        self.selected = set()
+        self.anchor = None
+        self.active = None
+        self.redraw()
+
+    def curselection(self) -> tuple:
+        return tuple(sorted(self.selected))
+
+    def set_selection(self, indices, active: int | None = None) -> None:
+        self.selected = {i for i in indices if 0 <= i < len(self.items)}
+        if active is None and self.selected:
+            active = min(self.selected)
+        self.active = active
+        self.anchor = active
+        self.redraw()
+
+    def see(self, index: int) -> None:
+        count = self._visible_count()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + count:
+            self.top = index - count + 1
+        self.redraw()
+
+    def yview(self, *args) -> None:
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.items))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self._visible_count()
+            self.top += amount
+        self.redraw()
+
+    def redraw(self) -> None:
+        count = self._visible_count()
+        self.top = max(0, min(self.top, len(self.items) - count))
+        while len(self.rows) < count + 1:
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, width=0)
+            text = self.canvas.create_text(0, 0, anchor="w", font=self.font)
+            self.rows.append((rect, text))
+
+        width = self.canvas.winfo_width()
+        for offset, (rect, text) in enumerate(self.rows):
+            index = self.top + offset
+            if offset > count or index >= len(self.items):
+                self.canvas.itemconfigure(rect, state="hidden")
+                self.canvas.itemconfigure(text, state="hidden")
+                continue
+            y = offset * self.row_height
+            selected = index in self.selected
+            self.canvas.coords(rect, 0, y, width, y + self.row_height)
+            self.canvas.itemconfigure(
+                rect,
+                state="normal",
+                fill=SELECT_BACKGROUND if selected else "",
+            )
+            self.canvas.coords(text, TEXT_INDENT, y + self.row_height / 2)
+            self.canvas.itemconfigure(
+                text,
+                state="normal",
+                text=self.label(self.items[index]),
+                fill=SELECT_FOREGROUND if selected else TEXT_FOREGROUND,
+            )
+
+        total = len(self.items)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + count) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _visible_count(self) -> int:
+        height = self.canvas.winfo_height()
+        if height <= 1:
+            height = int(self.canvas.cget("height"))
+        return max(1, height // self.row_height)
+
+    def _index_at(self, y: int) -> int | None:
+        index = self.top + int(y // self.row_height)
+        if 0 <= index < len(self.items):
+            return index
+        return None
+
+    def _notify(self) -> None:
+        self.event_generate("<<ListboxSelect>>")
+
+    def _on_click(self, event: tk.Event) -> None:
+        self.canvas.focus_set()
+        index = self._index_at(event.y)
+        if index is None:
+            return
+        self.set_selection([index], index)
+        self._notify()
+
+    def _on_shift_click(self, event: tk.Event) -> None:
+        index = self._index_at(event.y)
+        if index is None:
+            return
+        anchor = self.anchor if self.anchor is not None else index
+        low, high = sorted((anchor, index))
+        self.selected = set(range(low, high + 1))
+        self.active = index
+        self.redraw()
+        self._notify()
+
+    def _on_control_click(self, event: tk.Event) -> None:
+        index = self._index_at(event.y)
+        if index is None:
+            return
+        self.selected ^= {index}
+        self.active = index
+        self.anchor = index
+        self.redraw()
+        self._notify()
+
+    def _on_arrow(self, direction: int, extend: bool) -> str:
+        if not self.items:
+            return "break"
+        current = self.active if self.active is not None else self.top
+        index = max(0, min(len(self.items) - 1, current + direction))
+        if extend:
+            anchor = self.anchor if self.anchor is not None else current
+            low, high = sorted((anchor, index))
+            self.selected = set(range(low, high + 1))
+            self.active = index
+        else:
+            self.set_selection([index], index)
+        self.see(index)
+        self._notify()
+        return "break"
+
+    def _on_wheel(self, event: tk.Event) -> None:
+        steps = -int(event.delta / 120) if abs(event.delta) >= 120 else -event.delta
+        self.yview("scroll", steps * 3, "units")
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+from sources import FrameEntry, ZipEntry, read_source, source_name
+
+
+MANIFEST_VERSION = 2
+HASH_CHUNK_SIZE = 1 << 20
+HASH_CACHE_SIZE = 256
+
+
+def manifest_file(manifest_dir: str, output: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(output).encode("utf-8", "surrogatepass")).hexdigest()
+    return os.path.join(manifest_dir, f"{digest}.json")
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def content_hash(source, size: int, mtime_ns: int) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(source, ZipEntry):
+        digest.update(read_source(source))
+        return digest.hexdigest()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_entry(source, hash_contents: bool = False) -> list:
+    if isinstance(source, FrameEntry):
+        entry = source_entry(source.source, hash_contents)
+        entry[0] = source_name(source)
+        return entry
+    if isinstance(source, ZipEntry):
+        entry = [source.name, source.size, os.stat(source.archive).st_mtime_ns]
+    else:
+        stat = os.stat(source)
+        entry = [os.path.basename(source), stat.st_size, stat.st_mtime_ns]
+    if hash_contents:
+        entry.append(content_hash(source, entry[1], entry[2]))
+    return entry
+
+
+def output_entry(output: str) -> list | None:
+    try:
+        stat = os.stat(output)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_manifest(input_path: str, settings: dict, sources: list, hash_contents: bool = False) -> dict:
+    return {
+        "version": MANIFEST_VERSION,
+        "input": os.path.abspath(input_path),
+        "settings": settings,
+        "files": [source_entry(source, hash_contents) for source in sources],
+    }
+
+
+def load_manifest(manifest_dir: str, output: str) -> dict | None:
+    try:
+        with open(manifest_file(manifest_dir, output), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+    return data
+
+
+def save_manifest(manifest_dir: str, output: str, manifest: dict, result: dict) -> None:
+    outputs = {path: output_entry(path) for path in result.get("outputs") or [output]}
+    data = dict(manifest, outputs=outputs, pages=result["pages"], warnings=result["warnings"])
+    write_json(manifest_file(manifest_dir, output), data)
+
+
+def write_json(path: str, data: dict) -> None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def is_up_to_date(stored: dict | None, manifest: dict) -> bool:
+    if stored is None or not stored.get("outputs"):
+        return False
+    for path, entry in stored["outputs"].items():
+        if entry is None or output_entry(path) != entry:
+            return False
+    return all(stored.get(key) == manifest[key] for key in ("input", "settings", "files"))
+
+
+def sidecar_path(output: str) -> str:
+    return os.path.splitext(output)[0] + ".pdfmaker.json"
+
+
+def load_sidecar(output: str) -> dict | None:
+    try:
+        with open(sidecar_path(output), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+    return data
+
+
+def save_sidecar(output: str, settings: dict, files: list, pdf_state: dict) -> None:
+    data = {
+        "version": MANIFEST_VERSION,
+        "settings": settings,
+        "files": files,
+        "pdf": pdf_state,
+        "output": output_entry(output),
+    }
+    write_json(sidecar_path(output), data)
+
+
+def built_prefix(stored: dict | None, settings: dict, files: list, output: str) -> int:
+    if stored is None or stored.get("settings") != settings:
+        return 0
+    if stored.get("output") is None or stored["output"] != output_entry(output):
+        return 0
+    built = stored["files"]
+    if files[: len(built)] != built:
+        return 0
+    return len(built)
@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import NamedTuple
+
+from PIL import Image
+
+from imageprep import pixel_density
+from progress import JobCancelled, ProgressChannel
+from sources import FrameEntry, iter_frames, open_image, source_stamp
+
+
+METADATA_CACHE_SIZE = 1 << 16
+EXIF_ORIENTATION = 0x0112
+SWAPPED_ORIENTATIONS = (5, 6, 7, 8)
+FLIPPED_ORIENTATIONS = (2, 4, 5, 7)
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+class ImageInfo(NamedTuple):
+    width: int
+    height: int
+    dpi: tuple
+    orientation: int
+    mode: str
+
+
+def read_info(source) -> ImageInfo:
+    with open_image(source) as img:
+        return info_from_image(img, source)
+
+
+def info_from_image(img: Image.Image, source) -> ImageInfo:
+    orientation = 1
+    if not isinstance(source, FrameEntry) and (img.format != "PNG" or "exif" in img.info):
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+    return ImageInfo(img.width, img.height, pixel_density(img), orientation, img.mode)
+
+
+@lru_cache(maxsize=METADATA_CACHE_SIZE)
+def _cached_info(source, stamp: tuple) -> ImageInfo:
+    return read_info(source)
+
+
+def image_info(source) -> ImageInfo:
+    return _cached_info(source, source_stamp(source))
+
+
+def prefetch_info(sources: list, workers: int = 1, progress: ProgressChannel | None = None) -> dict:
+    groups = frame_groups(sources)
+    info = {}
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for group, results in zip(groups, executor.map(partial(_safe_group_info, progress=progress), groups)):
+            info.update(zip(group, results))
+    return info
+
+
+def frame_groups(sources: list) -> list:
+    groups = []
+    for source in sources:
+        if (
+            isinstance(source, FrameEntry)
+            and groups
+            and isinstance(groups[-1][-1], FrameEntry)
+            and groups[-1][-1].source == source.source
+            and groups[-1][-1].frame < source.frame
+        ):
+            groups[-1].append(source)
+        else:
+            groups.append([source])
+    return groups
+
+
+def _safe_group_info(group: list, progress: ProgressChannel | None = None) -> list:
+    if progress is not None and progress.cancelled:
+        return [JobCancelled() for _ in group]
+    if not isinstance(group[0], FrameEntry):
+        return [_safe_info(group[0])]
+    wanted = {entry.frame: entry for entry in group}
+    results = {}
+    try:
+        for frame, img in enumerate(iter_frames(group[0].source)):
+            if frame in wanted:
+                results[frame] = info_from_image(img, wanted[frame])
+            if frame >= group[-1].frame:
+                break
+    except Exception as exc:
+        return [results.get(entry.frame, exc) for entry in group]
+    return [results.get(entry.frame) or IndexError(f"missing frame {entry.frame + 1}") for entry in group]
+
+
+def _safe_info(source) -> ImageInfo | Exception:
+    try:
+        return image_info(source)
+    except Exception as exc:
+        return exc
+
+
+def is_swapped(info: ImageInfo) -> bool:
+    return info.orientation in SWAPPED_ORIENTATIONS
+
+
+def upright_size(info: ImageInfo) -> tuple[int, int]:
+    if is_swapped(info):
+        return info.height, info.width
+    return info.width, info.height
+
+
+def upright_dpi(info: ImageInfo) -> tuple:
+    if is_swapped(info):
+        return info.dpi[1], info.dpi[0]
+    return info.dpi
+
+
+def upright_info(info: ImageInfo) -> ImageInfo:
+    width, height = upright_size(info)
+    return info._replace(width=width, height=height, dpi=upright_dpi(info), orientation=1)
+
+
+def apply_orientation(img: Image.Image, orientation: int) -> Image.Image:
+    method = ORIENTATION_TRANSPOSE.get(orientation)
+    return img if method is None else img.transpose(method)
+
+
+def placed_size(info: ImageInfo, layout_fun, dpi: int) -> tuple[int, int] | None:
+    width, height = upright_size(info)
+    _, _, width_pt, height_pt = layout_fun(width, height, upright_dpi(info))
+    target = (max(1, round(width_pt * dpi / 72)), max(1, round(height_pt * dpi / 72)))
+    if target[0] >= width or target[1] >= height:
+        return None
+    return target
+
+
+def oriented_layout(layout_fun, info: ImageInfo):
+    if not is_swapped(info):
+        return layout_fun
+
+    def layout(width, height, ndpi):
+        page_width, page_height, image_width, image_height = layout_fun(height, width, (ndpi[1], ndpi[0]))
+        return page_height, page_width, image_height, image_width
+
+    return layout
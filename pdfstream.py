@@ -0,0 +1,331 @@
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import img2pdf
+
+from imageprep import downsample_image, prepare_image, upright_image
+from metadata import FLIPPED_ORIENTATIONS, image_info, oriented_layout, placed_size, prefetch_info, upright_info
+from progress import ProgressChannel
+from sources import FrameEntry, close_frame_handle, read_source, source_name, source_size
+
+
+PDF_HEADER = b"%PDF-1.3\n%\xe2\xe3\xcf\xd3\n"
+PREFETCH_DEPTH = 2
+
+
+def encode_page(rawdata: bytes, layout_fun):
+    return img2pdf.convert_to_docobject(
+        prepare_image(rawdata),
+        layout_fun=layout_fun,
+        engine=img2pdf.Engine.internal,
+        nodate=True,
+    )
+
+
+class StreamingPdfWriter:
+    def __init__(self, stream, progress: ProgressChannel | None = None, state: dict | None = None) -> None:
+        self.stream = stream
+        self.progress = progress or ProgressChannel()
+        self.offsets = {}
+        self.template = img2pdf.pdfdoc(img2pdf.Engine.internal)
+        self.template.writer.docinfo.identifier = 1
+        self.template.writer.catalog.identifier = 2
+        self.template.writer.pages.identifier = 3
+        if state:
+            self.page_ids = list(state["page_ids"])
+            self.version = state["version"]
+            self.next_id = state["next_id"]
+            self.prev_xref = state["xref"]
+            self.initial_version = self.version
+            self.position = self.stream.tell()
+        else:
+            self.page_ids = []
+            self.version = "1.3"
+            self.next_id = 4
+            self.prev_xref = None
+            self.initial_version = None
+            self.stream.write(PDF_HEADER)
+            self.position = len(PDF_HEADER)
+        self.xref = None
+
+    def __enter__(self) -> "StreamingPdfWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+
+    def add_document(self, doc) -> int:
+        with self.progress.stage("encode"):
+            skip = {id(doc.writer.docinfo), id(doc.writer.catalog), id(doc.writer.pages)}
+            objects = [obj for obj in doc.writer.objects if id(obj) not in skip]
+            for obj in objects:
+                obj.identifier = self.next_id
+                self.next_id += 1
+            for page in doc.writer.pagearray:
+                page[b"/Parent"] = self.template.writer.pages
+                self.page_ids.append(page.identifier)
+            chunks = [(obj.identifier, obj.tostring()) for obj in objects]
+        with self.progress.stage("write"):
+            for object_id, content in chunks:
+                self._write_object(object_id, content)
+        if doc.output_version > self.version:
+            self.version = doc.output_version
+        return len(doc.writer.pagearray)
+
+    def close(self) -> None:
+        writer = self.template.writer
+        writer.pages[b"/Kids"] = [img2pdf.MyPdfObject("%d 0 R" % i) for i in self.page_ids]
+        writer.pages[b"/Count"] = len(self.page_ids)
+        if self.version > "1.3":
+            writer.catalog[b"/Version"] = ("/" + self.version).encode("ascii")
+        if self.prev_xref is None:
+            updated = (writer.docinfo, writer.catalog, writer.pages)
+        elif self.version != self.initial_version:
+            updated = (writer.catalog, writer.pages)
+        else:
+            updated = (writer.pages,)
+        for obj in updated:
+            self._write_object(obj.identifier, obj.tostring())
+
+        self.xref = self.position
+        size = self.next_id
+        lines = [b"xref\n", *self._xref_sections()]
+        lines.append(b"trailer\n")
+        if self.prev_xref is None:
+            lines.append(b"<< /Size %d /Info 1 0 R /Root 2 0 R >>\n" % size)
+        else:
+            lines.append(b"<< /Size %d /Prev %d /Info 1 0 R /Root 2 0 R >>\n" % (size, self.prev_xref))
+        lines.append(b"startxref\n%d\n%%%%EOF\n" % self.xref)
+        with self.progress.stage("write"):
+            self.stream.write(b"".join(lines))
+
+    def state(self) -> dict:
+        return {
+            "page_ids": list(self.page_ids),
+            "version": self.version,
+            "next_id": self.next_id,
+            "xref": self.xref,
+        }
+
+    def _xref_sections(self) -> list:
+        entries = dict(self.offsets)
+        if self.prev_xref is None:
+            entries[0] = None
+        object_ids = sorted(entries)
+        lines = []
+        start = 0
+        while start < len(object_ids):
+            end = start + 1
+            while end < len(object_ids) and object_ids[end] == object_ids[end - 1] + 1:
+                end += 1
+            lines.append(b"%d %d\n" % (object_ids[start], end - start))
+            for object_id in object_ids[start:end]:
+                if entries[object_id] is None:
+                    lines.append(b"0000000000 65535 f \n")
+                else:
+                    lines.append(b"%010d 00000 n \n" % entries[object_id])
+            start = end
+        return lines
+
+    def _write_object(self, object_id: int, content: bytes) -> None:
+        self.offsets[object_id] = self.position
+        self.stream.write(content)
+        self.position += len(content)
+
+
+def load_image(source, metadata: dict | None = None) -> tuple:
+    info = metadata.get(source) if metadata else None
+    if info is None:
+        info = image_info(source)
+    if isinstance(info, Exception):
+        raise info
+    if info.orientation in FLIPPED_ORIENTATIONS:
+        return upright_image(read_source(source)), upright_info(info)
+    return read_source(source), info
+
+
+def load_downsampled_image(
+    source,
+    layout_fun,
+    downsample: tuple,
+    executor=None,
+    metadata: dict | None = None,
+) -> tuple:
+    data, info = load_image(source, metadata)
+    dpi, quality = downsample
+    size = None if info.mode == "1" else placed_size(info, layout_fun, dpi)
+    if size is None:
+        return data, info
+    if executor is None:
+        data = downsample_image(data, size, dpi, quality)
+    else:
+        data = executor.submit(downsample_image, data, size, dpi, quality).result()
+    return data, info._replace(width=size[0], height=size[1], dpi=(dpi, dpi), orientation=1)
+
+
+def iter_loaded_images(
+    paths: list,
+    workers: int = 1,
+    depth: int = PREFETCH_DEPTH,
+    max_bytes: int | None = None,
+    loader=load_image,
+):
+    window = max(workers, depth, 1)
+    pending = deque()
+    buffered = 0
+    frames = None
+    frames_source = None
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        try:
+            for path in paths:
+                size = source_size(path)
+                while pending and (
+                    len(pending) >= window or (max_bytes is not None and buffered + size > max_bytes)
+                ):
+                    item, item_size = _resolve(*pending.popleft())
+                    buffered -= item_size
+                    yield item
+                target = executor
+                if isinstance(path, FrameEntry):
+                    if frames is None or path.source != frames_source:
+                        _close_frame_reader(frames, wait=False)
+                        frames = ThreadPoolExecutor(max_workers=1)
+                        frames_source = path.source
+                    target = frames
+                pending.append((path, target.submit(loader, path), size))
+                buffered += size
+            while pending:
+                yield _resolve(*pending.popleft())[0]
+        finally:
+            for _, future, _ in pending:
+                future.cancel()
+            _close_frame_reader(frames, wait=True)
+
+
+def _close_frame_reader(frames: ThreadPoolExecutor | None, wait: bool) -> None:
+    if frames is None:
+        return
+    frames.submit(close_frame_handle)
+    frames.shutdown(wait=wait)
+
+
+def _resolve(path, future, size: int) -> tuple:
+    try:
+        return (path, future.result(), None), size
+    except Exception as exc:
+        return (path, None, exc), size
+
+
+def _measured(loader, source) -> tuple:
+    start = time.perf_counter()
+    item = loader(source)
+    return item, time.perf_counter() - start
+
+
+def _timed(items, progress: ProgressChannel, stage: str):
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            progress.add_time(stage, time.perf_counter() - start)
+        yield item
+
+
+def build_pdf(
+    output: str,
+    paths: list,
+    layout_fun,
+    workers: int = 1,
+    max_bytes: int | None = None,
+    progress: ProgressChannel | None = None,
+    downsample: tuple | None = None,
+    processes: int = 1,
+    state: dict | None = None,
+    atomic: bool = True,
+) -> tuple[int, list]:
+    progress = progress or ProgressChannel()
+    warnings = []
+    pages = 0
+    stream = None
+    writer = None
+    resampler = None
+    temp_path = f"{output}.{os.getpid()}.tmp" if atomic else output
+    original_size = os.path.getsize(output) if state else 0
+    progress.update(0, len(paths), "Reading image information...")
+    with progress.stage("validate"):
+        metadata = prefetch_info(paths, workers, progress)
+    progress.check_cancelled()
+    loader = partial(load_image, metadata=metadata)
+    if downsample is not None:
+        if processes > 1:
+            resampler = ProcessPoolExecutor(max_workers=processes)
+        loader = partial(
+            load_downsampled_image,
+            layout_fun=layout_fun,
+            downsample=downsample,
+            executor=resampler,
+            metadata=metadata,
+        )
+    loader = partial(_measured, loader)
+    try:
+        loaded = _timed(iter_loaded_images(paths, workers, max_bytes=max_bytes, loader=loader), progress, "validate")
+        for index, (path, item, error) in enumerate(loaded, start=1):
+            progress.check_cancelled()
+            progress.update(index, len(paths), f"Processing {index}/{len(paths)}: {source_name(path)}")
+            if error is None:
+                (data, info), seconds = item
+                start = time.perf_counter()
+                try:
+                    with progress.stage("encode"):
+                        doc = encode_page(data, oriented_layout(layout_fun, info))
+                except Exception as exc:
+                    error = exc
+            if error is not None:
+                warnings.append(source_name(path))
+                continue
+            size = source_size(path)
+            progress.add_bytes("read", size)
+            progress.record_file(source_name(path), seconds + time.perf_counter() - start, size)
+            if writer is None:
+                if state and atomic:
+                    shutil.copyfile(output, temp_path)
+                stream = open(temp_path, "ab" if state else "wb")
+                writer = StreamingPdfWriter(stream, progress, state)
+            pages += writer.add_document(doc)
+        if writer is not None:
+            writer.close()
+            progress.add_bytes("written", stream.tell() - original_size)
+            stream.close()
+            if atomic:
+                os.replace(temp_path, output)
+            if state is not None:
+                state.update(writer.state())
+    except BaseException:
+        if stream is not None:
+            stream.close()
+        if atomic or stream is not None:
+            _discard_partial(temp_path, original_size if state and not atomic else None)
+        raise
+    finally:
+        if resampler is not None:
+            resampler.shutdown(cancel_futures=True)
+    return pages, warnings
+
+
+def _discard_partial(path: str, size: int | None) -> None:
+    try:
+        if size is None:
+            os.remove(path)
+        else:
+            os.truncate(path, size)
+    except OSError:
+        pass
@@ -0,0 +1,117 @@
+import heapq
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+
+
+STAGES = ("scan", "validate", "encode", "write")
+SLOWEST_FILES = 10
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class ProgressChannel:
+    def __init__(self, cancel_event=None) -> None:
+        self.lock = threading.Lock()
+        self.value = 0
+        self.total = 0
+        self.message = ""
+        self.stage_times = {}
+        self.byte_counts = {}
+        self.slowest = []
+        self.version = 0
+        self.cancelled_here = threading.Event()
+        self._cancel_event = cancel_event
+
+    @property
+    def cancel_event(self):
+        with self.lock:
+            if self._cancel_event is None:
+                self._cancel_event = multiprocessing.Event()
+                if self.cancelled_here.is_set():
+                    self._cancel_event.set()
+            return self._cancel_event
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.cancelled_here.set()
+            if self._cancel_event is not None:
+                self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancelled_here.is_set() or (self._cancel_event is not None and self._cancel_event.is_set())
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise JobCancelled()
+
+    def update(self, value: int, total: int, message: str) -> None:
+        with self.lock:
+            self.value = value
+            self.total = total
+            self.message = message
+            self.version += 1
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+            self.version += 1
+
+    def merge_times(self, stage_times: dict) -> None:
+        for stage, seconds in stage_times.items():
+            self.add_time(stage, seconds)
+
+    def add_bytes(self, kind: str, count: int) -> None:
+        with self.lock:
+            self.byte_counts[kind] = self.byte_counts.get(kind, 0) + count
+
+    def record_file(self, name: str, seconds: float, size: int) -> None:
+        with self.lock:
+            item = (seconds, name, size)
+            if len(self.slowest) < SLOWEST_FILES:
+                heapq.heappush(self.slowest, item)
+            elif item > self.slowest[0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def merge_report(self, report: dict) -> None:
+        self.merge_times(report.get("stage_times", {}))
+        for kind, count in report.get("bytes", {}).items():
+            self.add_bytes(kind, count)
+        for name, seconds, size in report.get("slowest", []):
+            self.record_file(name, seconds, size)
+
+    def report(self) -> dict:
+        with self.lock:
+            slowest = sorted(self.slowest, reverse=True)
+            return {
+                "stage_times": dict(self.stage_times),
+                "bytes": dict(self.byte_counts),
+                "slowest": [[name, round(seconds, 4), size] for seconds, name, size in slowest],
+            }
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "value": self.value,
+                "total": self.total,
+                "message": self.message,
+                "stage_times": dict(self.stage_times),
+                "version": self.version,
+            }
+
+
+def format_stage_times(stage_times: dict) -> str:
+    parts = [f"{stage} {stage_times[stage]:.1f}s" for stage in STAGES if stage in stage_times]
+    return ", ".join(parts)
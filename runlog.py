@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from progress import ProgressChannel
+
+
+RUN_LOG_NAME = "runs.jsonl"
+RUN_LOG_MAX_BYTES = 8 * 1024 * 1024
+PROFILE_TOP = 40
+TRACEMALLOC_FRAMES = 8
+TRACEMALLOC_TOP = 30
+
+
+def run_record(kind: str, results: list, seconds: float, settings: dict) -> dict:
+    totals = ProgressChannel()
+    for result in results:
+        totals.merge_report(result)
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "kind": kind,
+        "seconds": round(seconds, 3),
+        "settings": settings,
+        "pages": sum(result.get("pages", 0) for result in results),
+        "totals": totals.report(),
+        "jobs": [job_record(result) for result in results],
+    }
+
+
+def job_record(result: dict) -> dict:
+    record = {
+        "input": result.get("input"),
+        "outputs": result.get("outputs") or [result.get("output")],
+        "status": result.get("status"),
+        "pages": result.get("pages", 0),
+        "skipped": len(result.get("warnings", [])),
+        "stage_times": {stage: round(value, 4) for stage, value in result.get("stage_times", {}).items()},
+        "bytes": result.get("bytes", {}),
+        "slowest": result.get("slowest", []),
+    }
+    for key in ("error", "captures"):
+        if key in result:
+            record[key] = result[key]
+    return record
+
+
+def append_run(log_dir: str, record: dict) -> str:
+    path = os.path.join(log_dir, RUN_LOG_NAME)
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > RUN_LOG_MAX_BYTES:
+            os.replace(path, f"{path}.1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+    return path
+
+
+@contextmanager
+def capture_run(capture_dir: str | None, name: str):
+    captures = []
+    if not capture_dir:
+        yield captures
+        return
+    import cProfile
+    import tracemalloc
+
+    os.makedirs(capture_dir, exist_ok=True)
+    stem = os.path.join(capture_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{name}")
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield captures
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        profiler.dump_stats(f"{stem}.prof")
+        with open(f"{stem}.txt", "w", encoding="utf-8") as f:
+            f.write(format_profile(profiler))
+            f.write(f"\nPeak traced memory: {peak / (1024 * 1024):.1f} MB\n\n")
+            f.write(format_allocations(snapshot))
+        captures.extend([f"{stem}.prof", f"{stem}.txt"])
+
+
+def format_profile(profiler) -> str:
+    import io
+    import pstats
+
+    buffer = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP)
+    return buffer.getvalue()
+
+
+def format_allocations(snapshot) -> str:
+    lines = [f"Top {TRACEMALLOC_TOP} allocation sites still held at the end of the run:"]
+    for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+        lines.append(str(stat))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,463 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import freeze_support, get_context
+from urllib.parse import parse_qs, urlparse
+
+from cli import PAGE_MODE_FLAGS, PROFILE_FLAGS
+from engine import (
+    DEFAULT_BATCH_WORKERS,
+    DEFAULT_VALIDATION_WORKERS,
+    DEFAULT_WORKER_MEMORY_MB,
+    PROFILE_DOWNSAMPLE,
+    is_zip_file,
+    layout_fun_for_mode,
+    run_log_dir,
+    scan_images,
+    scan_zip_images,
+)
+from progress import JobCancelled, ProgressChannel
+from runlog import append_run, run_record
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_LIMIT = 8
+DEFAULT_MAX_UPLOAD_MB = 2048
+STREAM_CHUNK_SIZE = 256 * 1024
+STREAM_POLL_SECONDS = 0.05
+RETRY_AFTER_SECONDS = 2
+LATENCY_WINDOW = 1000
+ZIP_TYPES = ("application/zip", "application/x-zip-compressed", "application/octet-stream")
+
+
+class CancelFile:
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def set(self) -> None:
+        with open(self.path, "w"):
+            pass
+
+    def is_set(self) -> bool:
+        return os.path.exists(self.path)
+
+
+def build_request(inputs: list, output: str, options: dict, cancel_path: str) -> dict:
+    from pdfstream import build_pdf
+
+    progress = ProgressChannel(CancelFile(cancel_path))
+    result = {"input": ", ".join(inputs), "output": output, "status": "", "pages": 0, "warnings": []}
+    with progress.stage("scan"):
+        records = []
+        for input_path in inputs:
+            records.extend(scan_zip_images(input_path) if is_zip_file(input_path) else scan_images(input_path))
+    if records:
+        pages, warnings = build_pdf(
+            output,
+            [record.source for record in records],
+            layout_fun_for_mode(options["page_mode"]),
+            workers=options["workers"],
+            max_bytes=options["max_bytes"],
+            progress=progress,
+            downsample=PROFILE_DOWNSAMPLE.get(options["profile"]),
+            atomic=False,
+        )
+        result["pages"] = pages
+        result["warnings"] = warnings
+    if not records:
+        result["status"] = "No supported images found."
+    elif not result["pages"]:
+        result["status"] = "No valid images found."
+    elif result["warnings"]:
+        result["status"] = f"Skipped {len(result['warnings'])} unreadable file(s)."
+    else:
+        result["status"] = "OK"
+    result.update(progress.report())
+    return result
+
+
+def summarize(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 1),
+        "p50": round(values[len(values) // 2], 1),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+        "max": round(values[-1], 1),
+    }
+
+
+class ServiceMetrics:
+    def __init__(self, workers: int, queue_limit: int) -> None:
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.counts = {"requests": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.bytes_sent = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.first_bytes = deque(maxlen=LATENCY_WINDOW)
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counts[name] += 1
+
+    def started(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self, outcome: str, seconds: float, first_byte: float | None, sent: int) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            self.counts[outcome] += 1
+            self.bytes_sent += sent
+            self.latencies.append(seconds * 1000)
+            if first_byte is not None:
+                self.first_bytes.append(first_byte * 1000)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(
+                self.counts,
+                workers=self.workers,
+                queue_limit=self.queue_limit,
+                in_flight=self.in_flight,
+                running=min(self.in_flight, self.workers),
+                queued=max(0, self.in_flight - self.workers),
+                peak_in_flight=self.peak_in_flight,
+                bytes_sent=self.bytes_sent,
+                latency_ms=summarize(self.latencies),
+                first_byte_ms=summarize(self.first_bytes),
+            )
+
+
+class Slot:
+    def __init__(self, semaphore: threading.BoundedSemaphore) -> None:
+        self.semaphore = semaphore
+        self.lock = threading.Lock()
+        self.held = True
+
+    def release(self) -> None:
+        with self.lock:
+            if self.held:
+                self.held = False
+                self.semaphore.release()
+
+
+class ConversionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple = (DEFAULT_HOST, DEFAULT_PORT),
+        workers: int = DEFAULT_BATCH_WORKERS,
+        queue_limit: int = DEFAULT_QUEUE_LIMIT,
+        max_upload_mb: int = DEFAULT_MAX_UPLOAD_MB,
+        allowed_roots: list | None = None,
+    ) -> None:
+        super().__init__(address, ConversionHandler)
+        workers = max(1, workers)
+        self.workers = workers
+        self.executor = self.new_executor()
+        self.executor_lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(workers + max(0, queue_limit))
+        self.metrics = ServiceMetrics(workers, max(0, queue_limit))
+        self.max_upload = max_upload_mb * 1024 * 1024
+        self.allowed_roots = [os.path.realpath(root) for root in allowed_roots or []]
+        self.work_dir = tempfile.mkdtemp(prefix="pdfmaker-service-")
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+
+    def submit(self, fn, *args):
+        with self.executor_lock:
+            try:
+                return self.executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self.new_executor()
+                return self.executor.submit(fn, *args)
+
+    def close(self) -> None:
+        if self.thread is not None:
+            self.shutdown()
+        self.server_close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def folder_allowed(self, path: str) -> bool:
+        real = os.path.realpath(path)
+        for root in self.allowed_roots:
+            try:
+                if os.path.commonpath([real, root]) == root:
+                    return True
+            except ValueError:
+                pass
+        return False
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: ConversionServer
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+        if path == "/health":
+            self.send_json(HTTPStatus.OK, {"status": "ok"})
+        elif path == "/metrics":
+            self.send_json(HTTPStatus.OK, self.server.metrics.snapshot())
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/convert":
+            self.close_connection = True
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+        self.server.metrics.count("requests")
+        try:
+            options = self.read_options(parse_qs(url.query))
+        except ValueError as exc:
+            self.server.metrics.count("failed")
+            self.close_connection = True
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+            return
+        if not self.server.slots.acquire(blocking=False):
+            self.server.metrics.count("rejected")
+            self.close_connection = True
+            self.send_json(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                {"error": "too many requests"},
+                {"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+            return
+        slot = Slot(self.server.slots)
+        job_dir = tempfile.mkdtemp(dir=self.server.work_dir)
+        try:
+            self.convert(job_dir, options, slot)
+        finally:
+            slot.release()
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    def read_options(self, query: dict) -> dict:
+        page_mode = query.get("page_mode", ["fit"])[0]
+        profile = query.get("profile", ["archive"])[0]
+        if page_mode not in PAGE_MODE_FLAGS:
+            raise ValueError(f"page_mode must be one of {', '.join(PAGE_MODE_FLAGS)}")
+        if profile not in PROFILE_FLAGS:
+            raise ValueError(f"profile must be one of {', '.join(PROFILE_FLAGS)}")
+        return {
+            "page_mode": PAGE_MODE_FLAGS[page_mode],
+            "profile": PROFILE_FLAGS[profile],
+            "workers": DEFAULT_VALIDATION_WORKERS,
+            "max_bytes": DEFAULT_WORKER_MEMORY_MB * 1024 * 1024,
+        }
+
+    def read_inputs(self, job_dir: str) -> list:
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise RequestError(HTTPStatus.LENGTH_REQUIRED, "Content-Length is required")
+        if not length.strip().isdigit():
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Content-Length must be a non-negative integer")
+        length = int(length)
+        if length > self.server.max_upload:
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "upload is too large")
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type in ZIP_TYPES:
+            path = os.path.join(job_dir, "upload.zip")
+            with open(path, "wb") as f:
+                remaining = length
+                while remaining:
+                    chunk = self.rfile.read(min(STREAM_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise RequestError(HTTPStatus.BAD_REQUEST, "upload ended early")
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            return [path]
+        if content_type != "application/json":
+            raise RequestError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "send a zip file or JSON with a folders list")
+        try:
+            folders = json.loads(self.rfile.read(length)).get("folders")
+        except (ValueError, AttributeError):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "invalid JSON") from None
+        if not isinstance(folders, list) or not folders or not all(isinstance(f, str) for f in folders):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "folders must be a non-empty list of paths")
+        if not self.server.allowed_roots:
+            raise RequestError(HTTPStatus.FORBIDDEN, "server folders are disabled; start the service with --allow")
+        for folder in folders:
+            if not self.server.folder_allowed(folder):
+                raise RequestError(HTTPStatus.FORBIDDEN, f"folder is outside the allowed roots: {folder}")
+            if not os.path.isdir(folder) and not is_zip_file(folder):
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"not a folder or zip file: {folder}")
+        return [os.path.realpath(folder) for folder in folders]
+
+    def convert(self, job_dir: str, options: dict, slot: Slot) -> None:
+        start = time.perf_counter()
+        try:
+            inputs = self.read_inputs(job_dir)
+        except RequestError as exc:
+            slot.release()
+            self.server.metrics.count("failed")
+            self.close_connection = True
+            try:
+                self.send_json(exc.status, {"error": exc.message})
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            return
+        output = os.path.join(job_dir, "output.pdf")
+        cancel = CancelFile(os.path.join(job_dir, "cancel"))
+        future = self.server.submit(build_request, inputs, output, options, cancel.path)
+        future.add_done_callback(lambda _: slot.release())
+        self.server.metrics.started()
+        outcome = "failed"
+        first_byte = None
+        sent = 0
+        result = None
+        try:
+            stream = self.wait_for_output(future, output)
+            if stream is None:
+                result = future.result()
+                self.send_json(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": result["status"]})
+                return
+            with stream:
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                first_byte = time.perf_counter() - start
+                while True:
+                    done = future.done()
+                    chunk = stream.read(STREAM_CHUNK_SIZE)
+                    if chunk:
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                        sent += len(chunk)
+                    elif done:
+                        break
+                    else:
+                        time.sleep(STREAM_POLL_SECONDS)
+                result = future.result()
+                self.wfile.write(b"0\r\n\r\n")
+            outcome = "completed"
+        except (BrokenPipeError, ConnectionResetError):
+            cancel.set()
+            outcome = "cancelled"
+            self.close_connection = True
+        except JobCancelled:
+            outcome = "cancelled"
+            self.close_connection = True
+        except Exception as exc:
+            self.close_connection = True
+            if first_byte is None:
+                self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)})
+        finally:
+            if not future.done():
+                cancel.set()
+            self.server.metrics.finished(outcome, time.perf_counter() - start, first_byte, sent)
+            if result is not None:
+                append_run(run_log_dir(), run_record("service", [result], time.perf_counter() - start, options))
+
+    def wait_for_output(self, future, output: str):
+        while True:
+            done = future.done()
+            try:
+                return open(output, "rb")
+            except FileNotFoundError:
+                pass
+            if done:
+                if future.exception() is not None:
+                    raise future.exception()
+                return None
+            time.sleep(STREAM_POLL_SECONDS)
+
+    def send_json(self, status: HTTPStatus, data: dict, headers: dict | None = None) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class RequestError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pdfmaker-server",
+        description="Serve image-to-PDF conversion over HTTP on this machine.",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (0 picks a free port)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BATCH_WORKERS, help="conversion processes")
+    parser.add_argument(
+        "--queue-limit",
+        type=int,
+        default=DEFAULT_QUEUE_LIMIT,
+        help="requests that may wait for a free process before new ones get 503",
+    )
+    parser.add_argument("--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD_MB, help="largest accepted zip upload")
+    parser.add_argument(
+        "--allow",
+        action="append",
+        default=[],
+        help="accept server-side folders under this path (repeatable; without it only zip uploads are accepted)",
+    )
+    return parser
+
+
+def main(argv: list | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    server = ConversionServer(
+        (args.host, args.port),
+        workers=args.workers,
+        queue_limit=args.queue_limit,
+        max_upload_mb=args.max_upload_mb,
+        allowed_roots=args.allow,
+    )
+    print(f"Serving on {server.url}. Press Ctrl+C to stop.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import argparse
+import http.client
+import json
+import os
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+from multiprocessing import freeze_support
+
+from PIL import Image
+
+from server import ConversionServer
+
+
+CHECK_PAGES = 3
+FD_CHECK_REQUESTS = 5
+REQUEST_TIMEOUT_SECONDS = 120
+SETTLE_SECONDS = 0.2
+MEDIA_BOX_RE = re.compile(rb"/MediaBox \[ ?([\d. ]+?) ?\]")
+
+
+def write_zip(path: str, members: dict) -> bytes:
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def jpeg_bytes(index: int) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (320, 240), (40 * index, 120, 200)).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def tiff_bytes(frames: int) -> bytes:
+    buffer = BytesIO()
+    pages = [Image.new("RGB", (320, 240), (60 * index, 80, 160)) for index in range(frames)]
+    pages[0].save(buffer, format="TIFF", save_all=True, append_images=pages[1:])
+    return buffer.getvalue()
+
+
+def media_boxes(pdf: bytes) -> list:
+    return [tuple(float(value) for value in box.split()) for box in MEDIA_BOX_RE.findall(pdf)]
+
+
+def open_fd_count() -> int | None:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def post(connection: http.client.HTTPConnection, url: str, body: bytes, content_type: str) -> tuple:
+    connection.request("POST", url, body, {"Content-Type": content_type})
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def raw_status(server: ConversionServer, content_length: str) -> int:
+    host, port = server.server_address[:2]
+    with socket.create_connection((host, port), timeout=REQUEST_TIMEOUT_SECONDS) as sock:
+        sock.sendall(
+            b"POST /convert HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/zip\r\n"
+            b"Content-Length: %s\r\n\r\n" % content_length.encode("ascii")
+        )
+        response = http.client.HTTPResponse(sock)
+        response.begin()
+        return response.status
+
+
+def hold_slot(server: ConversionServer) -> socket.socket:
+    host, port = server.server_address[:2]
+    before = server.metrics.snapshot()["requests"]
+    sock = socket.create_connection((host, port))
+    sock.sendall(
+        b"POST /convert HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/zip\r\n"
+        b"Content-Length: 1000000\r\n\r\npartial"
+    )
+    deadline = time.monotonic() + REQUEST_TIMEOUT_SECONDS
+    while server.metrics.snapshot()["requests"] == before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(SETTLE_SECONDS)
+    return sock
+
+
+def run_checks(work_dir: str) -> list:
+    folder = os.path.join(work_dir, "allowed", "photos")
+    os.makedirs(folder)
+    images = {f"page{index}.jpg": jpeg_bytes(index) for index in range(CHECK_PAGES)}
+    for name, data in images.items():
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(data)
+    good_zip = write_zip(os.path.join(work_dir, "good.zip"), images)
+    tiff_zip = write_zip(os.path.join(work_dir, "tiff.zip"), {"scan.tif": tiff_bytes(CHECK_PAGES)})
+    single_zip = write_zip(os.path.join(work_dir, "single.zip"), {"scan.tif": tiff_bytes(1)})
+    broken_zip = write_zip(os.path.join(work_dir, "broken.zip"), {"bad.jpg": b"not an image"})
+    outside = os.path.join(work_dir, "outside")
+    os.makedirs(outside)
+
+    server = ConversionServer(
+        ("127.0.0.1", 0),
+        workers=1,
+        queue_limit=0,
+        allowed_roots=[os.path.join(work_dir, "allowed")],
+    )
+    server.start()
+    host, port = server.server_address[:2]
+    results = []
+
+    def check(name: str, passed: bool, detail: str = "") -> None:
+        results.append((name, passed, detail))
+
+    try:
+        connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+        response, body = post(connection, "/convert", good_zip, "application/zip")
+        check(
+            "zip upload streams a PDF",
+            response.status == 200
+            and response.getheader("Transfer-Encoding") == "chunked"
+            and body.startswith(b"%PDF-")
+            and body.rstrip().endswith(b"%%EOF")
+            and b"/Count %d" % CHECK_PAGES in body,
+            f"status {response.status}, {len(body)} bytes",
+        )
+        response, body = post(connection, "/convert", good_zip, "application/zip")
+        check("next request on the same connection", response.status == 200, f"status {response.status}")
+        connection.close()
+
+        connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+        response, body = post(connection, "/convert?page_mode=huge", good_zip, "application/zip")
+        check("bad option returns 400", response.status == 400, f"status {response.status}")
+        connection.close()
+
+        for value in ("abc", "-5"):
+            status = raw_status(server, value)
+            check(f"Content-Length {value} returns 400", status == 400, f"status {status}")
+
+        connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+        response, body = post(connection, "/convert", broken_zip, "application/zip")
+        check("zip without valid images returns 422", response.status == 422, f"status {response.status}")
+        connection.close()
+
+        connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+        response, body = post(
+            connection, "/convert", json.dumps({"folders": [outside]}).encode("utf-8"), "application/json"
+        )
+        check("folder outside the allowed root returns 403", response.status == 403, f"status {response.status}")
+        connection.close()
+
+        connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+        response, body = post(
+            connection, "/convert", json.dumps({"folders": [folder]}).encode("utf-8"), "application/json"
+        )
+        check("allowed folder streams a PDF", response.status == 200 and body.startswith(b"%PDF-"))
+        connection.close()
+
+        held = hold_slot(server)
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+            response, body = post(connection, "/convert", good_zip, "application/zip")
+            check(
+                "full queue returns 503",
+                response.status == 503 and response.getheader("Retry-After") is not None,
+                f"status {response.status}",
+            )
+            connection.close()
+        finally:
+            held.close()
+
+        connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+        _, multi_pdf = post(connection, "/convert?page_mode=original", tiff_zip, "application/zip")
+        _, single_pdf = post(connection, "/convert?page_mode=original", single_zip, "application/zip")
+        connection.close()
+        multi, single = media_boxes(multi_pdf), media_boxes(single_pdf)
+        check(
+            "multi-page TIFF frames get the single-frame page size",
+            len(multi) == CHECK_PAGES and len(single) == 1 and set(multi) == set(single),
+            f"{multi[:1]} vs {single}",
+        )
+
+        counts = []
+        for _ in range(FD_CHECK_REQUESTS):
+            connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+            response, body = post(connection, "/convert", tiff_zip, "application/zip")
+            connection.close()
+            counts.append(server.submit(open_fd_count).result())
+        if counts[0] is not None:
+            check(
+                "multi-page TIFF zips leave no open files in the worker",
+                response.status == 200 and counts[-1] <= counts[0],
+                f"open files {counts[0]} -> {counts[-1]}",
+            )
+
+        try:
+            server.submit(os._exit, 1).result()
+        except Exception:
+            pass
+        connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+        response, body = post(connection, "/convert", good_zip, "application/zip")
+        check("recovers after a worker crash", response.status == 200, f"status {response.status}")
+        connection.close()
+    finally:
+        server.close()
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    return argparse.ArgumentParser(
+        description="Start the conversion service on localhost and check its responses."
+    )
+
+
+def main(argv: list | None = None) -> int:
+    build_parser().parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix="pdfmaker-check-")
+    try:
+        results = run_checks(work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    for name, passed, detail in results:
+        suffix = f" ({detail})" if detail else ""
+        print(f"{'ok' if passed else 'FAIL'}: {name}{suffix}")
+    return 0 if all(passed for _, passed, _ in results) else 1
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
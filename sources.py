@@ -0,0 +1,150 @@
+import os
+import threading
+import zipfile
+from typing import NamedTuple
+
+from PIL import Image
+
+from imageprep import frame_data
+
+
+class ZipEntry(NamedTuple):
+    archive: str
+    name: str
+    size: int
+
+
+class FrameEntry(NamedTuple):
+    source: object
+    frame: int
+    size: int
+
+
+class ImageRecord(NamedTuple):
+    source: object
+    name: str
+
+
+MULTI_FRAME_EXTENSIONS = {".gif", ".tif", ".tiff"}
+_zip_handles = threading.local()
+_frame_handles = threading.local()
+
+
+def _zip_handle(archive: str) -> zipfile.ZipFile:
+    handles = getattr(_zip_handles, "handles", None)
+    if handles is None:
+        handles = _zip_handles.handles = {}
+    mtime = os.stat(archive).st_mtime_ns
+    cached = handles.get(archive)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    handle = zipfile.ZipFile(archive, "r")
+    handles[archive] = (mtime, handle)
+    return handle
+
+
+def close_zip_handles() -> None:
+    handles = getattr(_zip_handles, "handles", None)
+    _zip_handles.handles = {}
+    for _, handle in (handles or {}).values():
+        handle.close()
+
+
+def list_zip_entries(archive: str, extensions: set) -> list:
+    with zipfile.ZipFile(archive, "r") as zf:
+        infos = zf.infolist()
+    entries = []
+    for info in infos:
+        if info.is_dir():
+            continue
+        if os.path.splitext(info.filename)[1].lower() in extensions:
+            entries.append(ZipEntry(archive, info.filename, info.file_size))
+    return entries
+
+
+def _frame_handle(source) -> Image.Image:
+    cached = getattr(_frame_handles, "current", None)
+    if cached is not None and cached[0] == source:
+        return cached[1]
+    close_frame_handle()
+    img = open_image(source)
+    _frame_handles.current = (source, img)
+    return img
+
+
+def close_frame_handle() -> None:
+    cached = getattr(_frame_handles, "current", None)
+    _frame_handles.current = None
+    if cached is not None:
+        cached[1].close()
+
+
+def read_source(source) -> bytes:
+    if isinstance(source, FrameEntry):
+        return frame_data(_frame_handle(source.source), source.frame)
+    if isinstance(source, ZipEntry):
+        return _zip_handle(source.archive).read(source.name)
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def open_image(source) -> Image.Image:
+    if isinstance(source, FrameEntry):
+        img = open_image(source.source)
+        img.seek(source.frame)
+        return img
+    if isinstance(source, ZipEntry):
+        return Image.open(_zip_handle(source.archive).open(source.name))
+    return Image.open(source)
+
+
+def frame_count(source) -> int:
+    if os.path.splitext(source_name(source))[1].lower() not in MULTI_FRAME_EXTENSIONS:
+        return 1
+    try:
+        with open_image(source) as img:
+            return getattr(img, "n_frames", 1)
+    except Exception:
+        return 1
+
+
+def iter_frames(source):
+    with open_image(source) as img:
+        for frame in range(getattr(img, "n_frames", 1)):
+            img.seek(frame)
+            yield img
+
+
+def expand_frames(source, frames: int) -> list:
+    if frames <= 1:
+        return [source]
+    size = source_size(source) // frames
+    return [FrameEntry(source, frame, size) for frame in range(frames)]
+
+
+def source_stamp(source) -> tuple:
+    if isinstance(source, FrameEntry):
+        return source_stamp(source.source)
+    if isinstance(source, ZipEntry):
+        return (source.size, os.stat(source.archive).st_mtime_ns)
+    stat = os.stat(source)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def source_size(source) -> int:
+    if isinstance(source, (ZipEntry, FrameEntry)):
+        return source.size
+    try:
+        return os.path.getsize(source)
+    except OSError:
+        return 0
+
+
+def source_name(source) -> str:
+    if isinstance(source, FrameEntry):
+        return f"{source_name(source.source)}#{source.frame + 1}"
+    if isinstance(source, ZipEntry):
+        return source.name.rsplit("/", 1)[-1]
+    return os.path.basename(source)
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+DEFERRED_MODULES = (
+    "img2pdf",
+    "pikepdf",
+    "pdfstream",
+    "watch",
+    "urllib.request",
+    "PIL.ImageTk",
+    "tkinterdnd2",
+    "cProfile",
+    "tracemalloc",
+)
+DEFAULT_RUNS = 5
+DEFAULT_IMPORT_BUDGET_MS = 400
+DEFAULT_PAINT_BUDGET_MS = 1500
+TOP_MODULES = 15
+REPORT_TIMEOUT_SECONDS = 60
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times() -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue
+        modules[fields[2].strip()] = (self_us, cumulative_us)
+    return modules
+
+
+def measure_imports(runs: int) -> dict:
+    samples = [import_times() for _ in range(runs)]
+    fastest = min(samples, key=lambda modules: modules["app"][1])
+    top = sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)[:TOP_MODULES]
+    return {
+        "ms": round(fastest["app"][1] / 1000, 1),
+        "loaded_deferred": [name for name in DEFERRED_MODULES if name in fastest],
+        "top": [{"module": name, "self_ms": round(self_us / 1000, 1)} for name, (self_us, _) in top],
+    }
+
+
+def has_display() -> bool:
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def measure_first_paint(runs: int) -> dict:
+    best = None
+    modules = []
+    for _ in range(runs):
+        started = time.time()
+        completed = subprocess.run(
+            [sys.executable, "app.py", "--startup-report"],
+            cwd=APP_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=REPORT_TIMEOUT_SECONDS,
+        )
+        report = json.loads(completed.stdout.strip().splitlines()[-1])
+        elapsed = (report["first_paint"] - started) * 1000
+        if best is None or elapsed < best:
+            best = elapsed
+            modules = report["modules"]
+    return {
+        "ms": round(best, 1),
+        "loaded_deferred": [name for name in DEFERRED_MODULES if name in modules],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Measure pdfmaker start-up time and fail when it exceeds the budget."
+    )
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="runs per measurement; the fastest is reported")
+    parser.add_argument(
+        "--import-budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS, help="allowed time to import app.py"
+    )
+    parser.add_argument(
+        "--budget-ms", type=float, default=DEFAULT_PAINT_BUDGET_MS, help="allowed time from launch to the first paint"
+    )
+    parser.add_argument("--json", action="store_true", help="print the measurements as JSON")
+    return parser
+
+
+def main(argv: list | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    runs = max(1, args.runs)
+    failures = []
+    data = {"imports": measure_imports(runs), "first_paint": None}
+    if data["imports"]["ms"] > args.import_budget_ms:
+        failures.append(f"import app took {data['imports']['ms']} ms (budget {args.import_budget_ms:g} ms)")
+    if data["imports"]["loaded_deferred"]:
+        failures.append("loaded at import: " + ", ".join(data["imports"]["loaded_deferred"]))
+    if has_display():
+        data["first_paint"] = measure_first_paint(runs)
+        if data["first_paint"]["ms"] > args.budget_ms:
+            failures.append(f"first paint took {data['first_paint']['ms']} ms (budget {args.budget_ms:g} ms)")
+        if data["first_paint"]["loaded_deferred"]:
+            failures.append("loaded before first paint: " + ", ".join(data["first_paint"]["loaded_deferred"]))
+    data["failures"] = failures
+
+    if args.json:
+        json.dump(data, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    else:
+        print(f"import app: {data['imports']['ms']} ms")
+        for entry in data["imports"]["top"]:
+            print(f"  {entry['self_ms']:7.1f} ms  {entry['module']}")
+        if data["first_paint"] is None:
+            print("first paint: skipped (no display)")
+        else:
+            print(f"first paint: {data['first_paint']['ms']} ms")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
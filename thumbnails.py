@@ -0,0 +1,159 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from metadata import apply_orientation, info_from_image
+from sources import FrameEntry, ZipEntry, open_image
+
+
+PREVIEW_SIZE = (280, 360)
+PREVIEW_MODES = ("RGB", "RGBA", "L", "LA")
+REDUCING_GAP = 2
+KEY_VERSION = 2
+MEMORY_ITEMS = 64
+DISK_ITEMS = 5000
+PRUNE_INTERVAL = 200
+
+
+def thumbnail_key(source) -> str | None:
+    if isinstance(source, FrameEntry):
+        key = thumbnail_key(source.source)
+        return None if key is None else f"{key}-{source.frame}"
+    try:
+        if isinstance(source, ZipEntry):
+            stat = os.stat(source.archive)
+            raw = f"{KEY_VERSION}|{source.archive}|{source.name}|{stat.st_mtime_ns}|{source.size}"
+        else:
+            stat = os.stat(source)
+            raw = f"{KEY_VERSION}|{os.path.abspath(source)}|{stat.st_mtime_ns}|{stat.st_size}"
+    except OSError:
+        return None
+    return hashlib.sha1(raw.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def decode_reduced(img: Image.Image, size: tuple) -> Image.Image:
+    if img.format == "JPEG":
+        img.draft(img.mode, (size[0] * REDUCING_GAP, size[1] * REDUCING_GAP))
+    img.load()
+    if img.mode not in PREVIEW_MODES:
+        has_alpha = "A" in img.mode or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    factor = min(img.width // (size[0] * REDUCING_GAP), img.height // (size[1] * REDUCING_GAP))
+    if factor > 1:
+        img = img.reduce(factor)
+    return img
+
+
+def make_thumbnail(source, size: tuple = PREVIEW_SIZE) -> Image.Image:
+    with open_image(source) as img:
+        orientation = info_from_image(img, source).orientation
+        thumb = decode_reduced(img, size)
+        if thumb is img:
+            thumb = img.copy()
+    thumb = apply_orientation(thumb, orientation)
+    thumb.thumbnail(size, Image.Resampling.LANCZOS)
+    return thumb
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir: str, memory_items: int = MEMORY_ITEMS, disk_items: int = DISK_ITEMS) -> None:
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = set()
+
+    def get(self, source) -> Image.Image | None:
+        key = thumbnail_key(source)
+        if key is None:
+            return None
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                return self.items[key]
+        thumb = self._load_from_disk(key)
+        if thumb is None:
+            try:
+                thumb = make_thumbnail(source)
+            except Exception:
+                return None
+            self._save_to_disk(key, thumb)
+        self._remember(key, thumb)
+        return thumb
+
+    def prefetch(self, sources: list) -> None:
+        for source in sources:
+            key = thumbnail_key(source)
+            if key is None:
+                continue
+            with self.lock:
+                if key in self.items or key in self.pending:
+                    continue
+                self.pending.add(key)
+            self.executor.submit(self._prefetch_one, key, source)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prefetch_one(self, key: str, source) -> None:
+        try:
+            self.get(source)
+        finally:
+            with self.lock:
+                self.pending.discard(key)
+
+    def _remember(self, key: str, thumb: Image.Image) -> None:
+        with self.lock:
+            self.items[key] = thumb
+            self.items.move_to_end(key)
+            while len(self.items) > self.memory_items:
+                self.items.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def _load_from_disk(self, key: str) -> Image.Image | None:
+        path = self._disk_path(key)
+        try:
+            with Image.open(path) as img:
+                img.load()
+                thumb = img.copy()
+            os.utime(path)
+        except Exception:
+            return None
+        return thumb
+
+    def _save_to_disk(self, key: str, thumb: Image.Image) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self._disk_path(key) + f".{threading.get_ident()}.tmp"
+            thumb.save(temp_path, "PNG")
+            os.replace(temp_path, self._disk_path(key))
+        except Exception:
+            return
+        with self.lock:
+            self.writes += 1
+            prune = self.writes % PRUNE_INTERVAL == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".png")]
+        except OSError:
+            return
+        if len(entries) <= self.disk_items:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[: len(entries) - self.disk_items]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
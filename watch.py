@@ -0,0 +1,219 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import SUPPORTED_EXTENSIONS, convert_input, init_worker, run_log_dir
+from progress import ProgressChannel
+from runlog import append_run, run_record
+
+
+DEBOUNCE_SECONDS = 3.0
+POLL_SECONDS = 2.0
+RESCAN_SECONDS = 60.0
+TICK_SECONDS = 0.5
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_READ_SIZE = 64 * 1024
+
+
+def folder_snapshot(folder: str) -> tuple:
+    entries = []
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if os.path.splitext(entry.name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    except OSError:
+        return ()
+    return tuple(sorted(entries))
+
+
+def is_settled(snapshot: tuple, previous: tuple | None, settle_seconds: float) -> bool:
+    if snapshot != previous:
+        return False
+    newest = max((mtime_ns for _, _, mtime_ns in snapshot), default=0)
+    return time.time_ns() - newest >= settle_seconds * 1e9
+
+
+class InotifySource:
+    def __init__(self, folders: list) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        for folder in folders:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                self.close()
+                raise OSError(ctypes.get_errno(), f"cannot watch {folder}")
+            self.watches[wd] = folder
+
+    def wait(self, timeout: float) -> set:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, INOTIFY_READ_SIZE)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            extension = os.path.splitext(os.fsdecode(name))[1].lower()
+            if wd in self.watches and extension in SUPPORTED_EXTENSIONS:
+                changed.add(self.watches[wd])
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def init_watch_worker(cancel_event) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_worker(cancel_event)
+
+
+def open_event_source(folders: list) -> InotifySource | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return InotifySource(folders)
+    except (OSError, AttributeError):
+        return None
+
+
+class FolderWatcher:
+    def __init__(
+        self,
+        jobs: list,
+        options: dict,
+        processes: int = 1,
+        on_result=None,
+        debounce: float = DEBOUNCE_SECONDS,
+        poll_interval: float = POLL_SECONDS,
+    ) -> None:
+        self.outputs = dict(jobs)
+        self.options = options
+        self.processes = max(1, processes)
+        self.on_result = on_result
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.channel = ProgressChannel()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self.stopped.set()
+        self.channel.cancel()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run(self) -> None:
+        folders = list(self.outputs)
+        source = open_event_source(folders)
+        rescan_interval = RESCAN_SECONDS if source is not None else self.poll_interval
+        signatures = {folder: folder_snapshot(folder) for folder in folders}
+        snapshots = {}
+        dirty = {folder: time.monotonic() - self.debounce for folder in folders}
+        building = {}
+        next_rescan = time.monotonic() + rescan_interval
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.processes, len(folders)),
+            initializer=init_watch_worker,
+            initargs=(self.channel.cancel_event,),
+        )
+        try:
+            while not self.stopped.is_set():
+                if source is not None:
+                    changed = source.wait(TICK_SECONDS)
+                else:
+                    self.stopped.wait(TICK_SECONDS)
+                    changed = set()
+                now = time.monotonic()
+                if now >= next_rescan:
+                    next_rescan = now + rescan_interval
+                    for folder in folders:
+                        signature = folder_snapshot(folder)
+                        if signature != signatures[folder]:
+                            signatures[folder] = signature
+                            changed.add(folder)
+                for folder in changed:
+                    dirty[folder] = now
+                for folder, (future, started) in list(building.items()):
+                    if future.done():
+                        del building[folder]
+                        self._finish(folder, future, time.monotonic() - started)
+                for folder, changed_at in sorted(dirty.items(), key=lambda item: item[1]):
+                    if len(building) >= self.processes:
+                        break
+                    if folder in building or now - changed_at < self.debounce:
+                        continue
+                    snapshot = folder_snapshot(folder)
+                    previous = snapshots.get(folder)
+                    snapshots[folder] = snapshot
+                    if not is_settled(snapshot, previous, self.debounce):
+                        dirty[folder] = now
+                        continue
+                    del dirty[folder]
+                    signatures[folder] = snapshot
+                    future = executor.submit(
+                        convert_input,
+                        folder,
+                        self.outputs[folder],
+                        processes=1,
+                        use_cache=True,
+                        **self.options,
+                    )
+                    building[folder] = (future, time.monotonic())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if source is not None:
+                source.close()
+
+    def _finish(self, folder: str, future, seconds: float) -> None:
+        try:
+            result = future.result()
+        except Exception as exc:
+            result = {
+                "input": folder,
+                "output": self.outputs[folder],
+                "status": f"Failed: {exc}",
+                "pages": 0,
+                "warnings": [],
+            }
+        if not result.get("up_to_date"):
+            append_run(run_log_dir(), run_record("watch", [result], seconds, self.options))
+        if self.on_result is not None:
+            self.on_result(result)